@@ -0,0 +1,72 @@
+from datetime import date
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database.dependencies import get_database, get_async_database
+from core.query_budget.config import query_budget
+from apps.admin import utils
+from apps.admin.schemas import ChildrenByAge, DailySignups, ParentActivity
+from typing import Annotated, Optional
+from authentication.schemas import UserBase
+from common.constants import DATABASE_ASYNC_MODE
+from common.utils.auth import get_current_superuser, get_current_superuser_async
+
+
+router = APIRouter(tags=["Admin"])
+
+
+if DATABASE_ASYNC_MODE:
+
+    @router.get("/analytics/children-by-age", response_model=ChildrenByAge)
+    @query_budget(2)
+    async def children_by_age(
+        current_user: Annotated[UserBase, Depends(get_current_superuser_async)],
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.children_by_age_async(db)
+
+    @router.get("/analytics/daily-signups", response_model=DailySignups)
+    @query_budget(2)
+    async def daily_signups(
+        current_user: Annotated[UserBase, Depends(get_current_superuser_async)],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.daily_signups_async(start_date, end_date, db)
+
+    @router.get("/analytics/parents", response_model=ParentActivity)
+    @query_budget(2)
+    async def parent_activity(
+        current_user: Annotated[UserBase, Depends(get_current_superuser_async)],
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.parent_activity_async(db)
+
+else:
+
+    @router.get("/analytics/children-by-age", response_model=ChildrenByAge)
+    @query_budget(2)
+    def children_by_age(
+        current_user: Annotated[UserBase, Depends(get_current_superuser)],
+        db: Session = Depends(get_database),
+    ):
+        return utils.children_by_age(db)
+
+    @router.get("/analytics/daily-signups", response_model=DailySignups)
+    @query_budget(2)
+    def daily_signups(
+        current_user: Annotated[UserBase, Depends(get_current_superuser)],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        db: Session = Depends(get_database),
+    ):
+        return utils.daily_signups(start_date, end_date, db)
+
+    @router.get("/analytics/parents", response_model=ParentActivity)
+    @query_budget(2)
+    def parent_activity(
+        current_user: Annotated[UserBase, Depends(get_current_superuser)],
+        db: Session = Depends(get_database),
+    ):
+        return utils.parent_activity(db)
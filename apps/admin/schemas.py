@@ -0,0 +1,38 @@
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class AgeBracketCount(BaseModel):
+    bracket: str
+    children: int
+
+
+class ChildrenByAge(BaseModel):
+    status: int
+    data: List[AgeBracketCount]
+    refreshed_at: Optional[datetime] = None
+
+
+class DailySignupCount(BaseModel):
+    day: date
+    children: int
+    parents: int
+
+
+class DailySignups(BaseModel):
+    status: int
+    data: List[DailySignupCount]
+    refreshed_at: Optional[datetime] = None
+
+
+class ParentStatusCount(BaseModel):
+    active: int
+    inactive: int
+    deleted: int
+
+
+class ParentActivity(BaseModel):
+    status: int
+    data: ParentStatusCount
+    refreshed_at: Optional[datetime] = None
@@ -0,0 +1,202 @@
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import column, select, table, text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+from core.database.config import SessionLocal
+from common.constants import ANALYTICS_REFRESH_INTERVAL
+from common.scheduler import delete_done_jobs, job_task, unique_job_insert
+
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+# Days of signups returned when no range is given, and the widest range allowed
+ANALYTICS_DAILY_DEFAULT_DAYS = 30
+ANALYTICS_DAILY_MAX_DAYS = 366
+
+PARENT_STATUSES = ("active", "inactive", "deleted")
+
+# Materialized views created by migration 7a3e61d09b52; the routes only read
+# these, never children or users
+children_by_age_view = table(
+    "analytics_children_by_age",
+    column("bracket"),
+    column("position"),
+    column("children"),
+    column("refreshed_at"),
+)
+daily_signups_view = table(
+    "analytics_daily_signups",
+    column("day"),
+    column("children"),
+    column("parents"),
+    column("refreshed_at"),
+)
+parent_status_view = table(
+    "analytics_parent_status",
+    column("status"),
+    column("parents"),
+    column("refreshed_at"),
+)
+ANALYTICS_VIEWS = (children_by_age_view, daily_signups_view, parent_status_view)
+
+
+def analytics_refresh_job(run_at: datetime):
+    """
+    Build the job insert for the analytics refresh due at `run_at`.
+
+    Refreshes are aligned to ANALYTICS_REFRESH_INTERVAL seconds and keyed by
+    their slot, so every process scheduling the same slot enqueues one job.
+    """
+    offset = (run_at - EPOCH).total_seconds() % ANALYTICS_REFRESH_INTERVAL
+    slot = run_at - timedelta(seconds=offset)
+
+    return unique_job_insert(
+        refresh_analytics,
+        dedupe_key=f"analytics_refresh:{slot.isoformat()}",
+        args=(slot.isoformat(),),
+        delay_seconds=max((slot - datetime.utcnow()).total_seconds(), 0),
+    )
+
+
+def schedule_analytics_refresh():
+    """
+    Enqueue the refresh of the current slot, which then schedules the next one.
+
+    Called on startup; a slot refreshed already is not enqueued again.
+    """
+    if not ANALYTICS_REFRESH_INTERVAL:
+        return
+    try:
+        with SessionLocal() as db:
+            db.execute(analytics_refresh_job(datetime.utcnow()))
+            db.commit()
+    except Exception:
+        logger.exception("Could not schedule the analytics refresh")
+
+
+@job_task
+def refresh_analytics(slot: str):
+    """
+    Refresh the analytics views and schedule the next refresh.
+
+    The next slot is enqueued first, so a failing refresh (retried on its own)
+    does not break the chain. It follows the current time rather than this
+    slot, so a refresh run late (e.g. after downtime) does not replay every
+    missed slot. The rows of earlier refreshes are pruned. CONCURRENTLY keeps
+    the views readable while they are rebuilt.
+    """
+    slot = datetime.fromisoformat(slot)
+    next_slot = max(slot, datetime.utcnow()) + timedelta(
+        seconds=ANALYTICS_REFRESH_INTERVAL
+    )
+    with SessionLocal() as db:
+        db.execute(analytics_refresh_job(next_slot))
+        db.execute(delete_done_jobs(refresh_analytics, before=slot))
+        db.commit()
+
+    with SessionLocal() as db:
+        for view in ANALYTICS_VIEWS:
+            db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view.name}"))
+        db.commit()
+
+
+def signups_range(start_date: date, end_date: date):
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(
+        days=ANALYTICS_DAILY_DEFAULT_DAYS - 1
+    )
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date",
+        )
+    if (end_date - start_date).days >= ANALYTICS_DAILY_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The range cannot exceed {ANALYTICS_DAILY_MAX_DAYS} days",
+        )
+    return start_date, end_date
+
+
+def children_by_age_query():
+    view = children_by_age_view
+    return select(view.c.bracket, view.c.children, view.c.refreshed_at).order_by(
+        view.c.position
+    )
+
+
+def daily_signups_query(start_date: date, end_date: date):
+    view = daily_signups_view
+    return (
+        select(view.c.day, view.c.children, view.c.parents, view.c.refreshed_at)
+        .where(view.c.day.between(start_date, end_date))
+        .order_by(view.c.day)
+    )
+
+
+def parent_status_query():
+    view = parent_status_view
+    return select(view.c.status, view.c.parents, view.c.refreshed_at)
+
+
+def analytics_response(data, rows):
+    content = {
+        "status": status.HTTP_200_OK,
+        "data": data,
+        "refreshed_at": rows[0].refreshed_at if rows else None,
+    }
+    return ORJSONResponse(content=content, status_code=status.HTTP_200_OK)
+
+
+def children_by_age_response(rows):
+    data = [{"bracket": row.bracket, "children": row.children} for row in rows]
+    return analytics_response(data, rows)
+
+
+def daily_signups_response(rows):
+    data = [
+        {"day": row.day, "children": row.children, "parents": row.parents}
+        for row in rows
+    ]
+    return analytics_response(data, rows)
+
+
+def parent_status_response(rows):
+    data = dict.fromkeys(PARENT_STATUSES, 0)
+    data.update({row.status: row.parents for row in rows})
+    return analytics_response(data, rows)
+
+
+def children_by_age(db: Session):
+    return children_by_age_response(db.execute(children_by_age_query()).all())
+
+
+async def children_by_age_async(db: AsyncSession):
+    result = await db.execute(children_by_age_query())
+    return children_by_age_response(result.all())
+
+
+def daily_signups(start_date: date, end_date: date, db: Session):
+    start_date, end_date = signups_range(start_date, end_date)
+    rows = db.execute(daily_signups_query(start_date, end_date)).all()
+    return daily_signups_response(rows)
+
+
+async def daily_signups_async(start_date: date, end_date: date, db: AsyncSession):
+    start_date, end_date = signups_range(start_date, end_date)
+    result = await db.execute(daily_signups_query(start_date, end_date))
+    return daily_signups_response(result.all())
+
+
+def parent_activity(db: Session):
+    return parent_status_response(db.execute(parent_status_query()).all())
+
+
+async def parent_activity_async(db: AsyncSession):
+    result = await db.execute(parent_status_query())
+    return parent_status_response(result.all())
@@ -1,43 +1,184 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
-from core.database.dependencies import get_database
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database.dependencies import get_database, get_async_database
+from core.query_budget.config import query_budget
 from authentication.schemas import UserBase
 from typing import Annotated, Optional
-from common.utils.auth import get_current_active_user
+from common.constants import DATABASE_ASYNC_MODE
+from common.utils.auth import get_current_active_user, get_current_active_user_async
 from apps.child import utils
-from apps.child.schemas import ChildrenList, ChildCreate, ChildOut, ChildUpdate
+from apps.child.schemas import (
+    ChildrenList,
+    ChildSearchResults,
+    ChildCreate,
+    ChildOut,
+    ChildUpdate,
+    ChildBulkCreate,
+    ChildBulkResults,
+    ChildBulkUpdate,
+    ChildBulkUpdated,
+)
 from datetime import date
 
 
 router = APIRouter(tags=["Child"])
 
 
-@router.get("/", response_model=ChildrenList)
-def read_own_children(
-    current_user: Annotated[UserBase, Depends(get_current_active_user)],
-    name: Optional[str] = None,
-    age: Optional[int] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    db: Session = Depends(get_database),
-):
-    return utils.read_own_children(current_user, name, age, start_date, end_date, db)
-
-
-@router.post("/", response_model=ChildOut)
-def add_child(
-    current_user: Annotated[UserBase, Depends(get_current_active_user)],
-    user: ChildCreate,
-    db: Session = Depends(get_database),
-):
-    return utils.add_child(current_user, user, db)
-
-
-@router.patch("/", response_model=ChildUpdate)
-def update_child(
-    current_user: Annotated[UserBase, Depends(get_current_active_user)],
-    child_id: int,
-    user: ChildUpdate,
-    db: Session = Depends(get_database),
-):
-    return utils.update_child(current_user, child_id, user, db)
+if DATABASE_ASYNC_MODE:
+
+    @router.get("/", response_model=ChildrenList)
+    @query_budget(3)
+    async def read_own_children(
+        request: Request,
+        current_user: Annotated[UserBase, Depends(get_current_active_user_async)],
+        name: Optional[str] = None,
+        age: Optional[int] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: int = Query(
+            utils.CHILDREN_PAGE_SIZE, ge=1, le=utils.CHILDREN_MAX_PAGE_SIZE
+        ),
+        cursor: Optional[str] = None,
+        stream: bool = False,
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        if stream:
+            return utils.stream_own_children_async(
+                current_user, name, age, start_date, end_date, cursor
+            )
+
+        return await utils.read_own_children_async(
+            request, current_user, name, age, start_date, end_date, limit, cursor, db
+        )
+
+    @router.get("/search", response_model=ChildSearchResults)
+    @query_budget(2)
+    async def search_children(
+        current_user: Annotated[UserBase, Depends(get_current_active_user_async)],
+        q: str = Query(..., min_length=1, max_length=200),
+        limit: int = Query(
+            utils.CHILDREN_SEARCH_PAGE_SIZE,
+            ge=1,
+            le=utils.CHILDREN_SEARCH_MAX_PAGE_SIZE,
+        ),
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.search_children_async(current_user, q, limit, cursor, db)
+
+    @router.post("/", response_model=ChildOut)
+    @query_budget(6)
+    async def add_child(
+        current_user: Annotated[UserBase, Depends(get_current_active_user_async)],
+        user: ChildCreate,
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.add_child_async(current_user, user, db)
+
+    @router.post("/bulk", response_model=ChildBulkResults)
+    @query_budget(5)
+    async def add_children(
+        current_user: Annotated[UserBase, Depends(get_current_active_user_async)],
+        bulk: ChildBulkCreate,
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.add_children_async(current_user, bulk.children, db)
+
+    @router.patch("/", response_model=ChildUpdate)
+    @query_budget(4)
+    async def update_child(
+        current_user: Annotated[UserBase, Depends(get_current_active_user_async)],
+        child_id: int,
+        user: ChildUpdate,
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.update_child_async(current_user, child_id, user, db)
+
+    @router.patch("/bulk", response_model=ChildBulkUpdated)
+    @query_budget(2)
+    async def update_children(
+        current_user: Annotated[UserBase, Depends(get_current_active_user_async)],
+        bulk: ChildBulkUpdate,
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.update_children_async(current_user, bulk.children, db)
+
+else:
+
+    @router.get("/", response_model=ChildrenList)
+    @query_budget(3)
+    def read_own_children(
+        request: Request,
+        current_user: Annotated[UserBase, Depends(get_current_active_user)],
+        name: Optional[str] = None,
+        age: Optional[int] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: int = Query(
+            utils.CHILDREN_PAGE_SIZE, ge=1, le=utils.CHILDREN_MAX_PAGE_SIZE
+        ),
+        cursor: Optional[str] = None,
+        stream: bool = False,
+        db: Session = Depends(get_database),
+    ):
+        if stream:
+            return utils.stream_own_children(
+                current_user, name, age, start_date, end_date, cursor
+            )
+
+        return utils.read_own_children(
+            request, current_user, name, age, start_date, end_date, limit, cursor, db
+        )
+
+    @router.get("/search", response_model=ChildSearchResults)
+    @query_budget(2)
+    def search_children(
+        current_user: Annotated[UserBase, Depends(get_current_active_user)],
+        q: str = Query(..., min_length=1, max_length=200),
+        limit: int = Query(
+            utils.CHILDREN_SEARCH_PAGE_SIZE,
+            ge=1,
+            le=utils.CHILDREN_SEARCH_MAX_PAGE_SIZE,
+        ),
+        cursor: Optional[str] = None,
+        db: Session = Depends(get_database),
+    ):
+        return utils.search_children(current_user, q, limit, cursor, db)
+
+    @router.post("/", response_model=ChildOut)
+    @query_budget(6)
+    def add_child(
+        current_user: Annotated[UserBase, Depends(get_current_active_user)],
+        user: ChildCreate,
+        db: Session = Depends(get_database),
+    ):
+        return utils.add_child(current_user, user, db)
+
+    @router.post("/bulk", response_model=ChildBulkResults)
+    @query_budget(5)
+    def add_children(
+        current_user: Annotated[UserBase, Depends(get_current_active_user)],
+        bulk: ChildBulkCreate,
+        db: Session = Depends(get_database),
+    ):
+        return utils.add_children(current_user, bulk.children, db)
+
+    @router.patch("/", response_model=ChildUpdate)
+    @query_budget(4)
+    def update_child(
+        current_user: Annotated[UserBase, Depends(get_current_active_user)],
+        child_id: int,
+        user: ChildUpdate,
+        db: Session = Depends(get_database),
+    ):
+        return utils.update_child(current_user, child_id, user, db)
+
+    @router.patch("/bulk", response_model=ChildBulkUpdated)
+    @query_budget(2)
+    def update_children(
+        current_user: Annotated[UserBase, Depends(get_current_active_user)],
+        bulk: ChildBulkUpdate,
+        db: Session = Depends(get_database),
+    ):
+        return utils.update_children(current_user, bulk.children, db)
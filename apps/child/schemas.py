@@ -1,10 +1,14 @@
 from pydantic import BaseModel, Field, root_validator, validator
-from typing import Optional
+from typing import Any, Dict, Optional
 from typing import List
 from datetime import datetime
 import re
 
 
+# Largest batch accepted by the bulk create endpoint
+CHILDREN_BULK_MAX_ITEMS = 500
+
+
 class ChildBase(BaseModel):
     parent_id: int
     name: str
@@ -23,6 +27,17 @@ class ChildOut(ChildBase):
 class ChildrenList(BaseModel):
     status: int
     data: List[ChildOut]
+    next_cursor: Optional[str] = None
+
+
+class ChildSearchResult(ChildOut):
+    rank: float
+
+
+class ChildSearchResults(BaseModel):
+    status: int
+    data: List[ChildSearchResult]
+    next_cursor: Optional[str] = None
 
 
 class ChildCreate(BaseModel):
@@ -62,6 +77,30 @@ class ChildCreate(BaseModel):
         return values
 
 
+class ChildBulkCreate(BaseModel):
+    # Items are validated one by one against ChildCreate, so an invalid item
+    # is reported in the results instead of rejecting the whole batch
+    children: List[Dict[str, Any]] = Field(
+        ...,
+        min_length=1,
+        max_length=CHILDREN_BULK_MAX_ITEMS,
+        example=[{"name": "John Doe", "age": 3, "additional_info": None}],
+    )
+
+
+class ChildBulkResult(BaseModel):
+    index: int
+    status: int
+    data: Optional[Dict[str, Any]] = None
+    errors: Optional[List[Dict[str, Any]]] = None
+
+
+class ChildBulkResults(BaseModel):
+    status: int
+    message: str
+    data: List[ChildBulkResult]
+
+
 class ChildUpdate(BaseModel):
     name: Optional[str] = None
     age: Optional[int] = None
@@ -86,3 +125,27 @@ class ChildUpdate(BaseModel):
         return value
 
 
+class ChildBulkUpdateItem(ChildUpdate):
+    child_id: int
+
+
+class ChildBulkUpdate(BaseModel):
+    children: List[ChildBulkUpdateItem] = Field(
+        ..., min_length=1, max_length=CHILDREN_BULK_MAX_ITEMS
+    )
+
+    @validator("children")
+    def validate_unique_children(cls, value):
+        # A child can only be updated once per statement
+        child_ids = [item.child_id for item in value]
+        if len(set(child_ids)) != len(child_ids):
+            raise ValueError("Each child_id can only appear once")
+
+        return value
+
+
+class ChildBulkUpdated(BaseModel):
+    status: int
+    message: str
+    data: List[Dict[str, Any]]
+    not_found: List[int]
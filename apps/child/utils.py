@@ -1,26 +1,116 @@
+import re
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    REAL,
+    String,
+    and_,
+    cast,
+    column,
+    false,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Session
-from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from common.models import Child
 from authentication.schemas import UserBase
-from apps.child.schemas import ChildCreate, ChildUpdate
-from fastapi import HTTPException, status
+from apps.child.schemas import ChildCreate, ChildUpdate, ChildBulkUpdateItem
+from fastapi import HTTPException, Request, status
 from datetime import date, datetime, time
-from common.scheduler import schedule_job
-from common.utils.emails import send_admin_email
+from typing import List
+from common.scheduler import enqueue_job
+from common.utils.emails import (
+    send_admin_email,
+    send_admin_bulk_email,
+    child_added_digest_job,
+)
+from common.constants import CHILD_ADDED_DIGEST_ENABLED
+from common.utils.pagination import decode_cursor, encode_cursor
+from common.serializers import compile_serializer, serialize, serialize_many
+from common.utils.conditional import (
+    conditional_headers,
+    is_not_modified,
+    not_modified_response,
+)
 from common.models import User
+from core.database.config import SessionLocal, AsyncSessionLocal, engine
 
 
-def read_own_children(
+# Keyset pagination of the children listing
+CHILDREN_PAGE_SIZE = 100
+CHILDREN_MAX_PAGE_SIZE = 1000
+
+# Rows fetched per round trip from the server-side cursor in streaming mode
+CHILDREN_STREAM_BATCH_SIZE = 500
+
+# Serialized fields: ChildOut for listings, in its field order, and the
+# created and updated child responses
+CHILD_OUT_FIELDS = ("parent_id", "name", "age", "additional_info", "created_at", "id")
+CHILD_FIELDS = ("id", "name", "age", "additional_info", "created_at")
+CHILD_UPDATED_FIELDS = CHILD_FIELDS + ("updated_at",)
+
+# Ranked full-text search pages
+CHILDREN_SEARCH_PAGE_SIZE = 20
+CHILDREN_SEARCH_MAX_PAGE_SIZE = 100
+
+# Generated by Postgres from the name (weight A) and additional_info (weight B)
+# and GIN indexed, not mapped on Child (see the add children search vector
+# migration). "simple" keeps names as written, without stemming.
+CHILD_SEARCH_VECTOR = literal_column("children.search_vector", TSVECTOR)
+CHILD_SEARCH_CONFIG = "simple"
+
+# The listing's name filter uses the search vector where it exists, and falls
+# back to a substring match on other databases (e.g. SQLite in load tests)
+NAME_FILTER_FULL_TEXT = engine.dialect.name == "postgresql"
+
+
+def prefix_tsquery(text: str, weights: str = ""):
+    """
+    Build a tsquery matching rows with a word starting with each word of `text`,
+    e.g. "ann le" becomes ann:* & le:*, restricted to `weights` if given.
+
+    Returns None when `text` has no words.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return func.to_tsquery(
+        CHILD_SEARCH_CONFIG, " & ".join(f"{word}:*{weights}" for word in words)
+    )
+
+
+def children_query(
     current_user: UserBase,
     name: str,
     age: int,
     start_date: date,
     end_date: date,
-    db: Session,
 ):
-    query = db.query(Child).filter_by(parent=current_user)
+    """
+    Build the select statement for the current user's children and filters.
+
+    Shared by the sync and async code paths.
+    """
+    query = select(Child).filter_by(parent_id=current_user.id)
 
-    if name:
+    if name and NAME_FILTER_FULL_TEXT:
+        # Case-insensitive word prefixes of the name, served by the GIN index
+        tsquery = prefix_tsquery(name, weights="A")
+        query = query.filter(
+            false() if tsquery is None else CHILD_SEARCH_VECTOR.bool_op("@@")(tsquery)
+        )
+    elif name:
         query = query.filter(Child.name.ilike(f"%{name}%"))  # Case-insensitive search
 
     if age:
@@ -34,51 +124,465 @@ def read_own_children(
         end_datetime = datetime.combine(end_date, time.max)  # Set time to 23:59:59
         query = query.filter(Child.created_at <= end_datetime)
 
-    children = query.all()
+    return query
+
 
-    return {
+def paginated_children_query(
+    current_user: UserBase,
+    name: str,
+    age: int,
+    start_date: date,
+    end_date: date,
+    cursor: str,
+):
+    """
+    Order the children query by (created_at, id) and seek past the cursor.
+
+    created_at is always set on insert; rows where it is NULL cannot be
+    placed in the keyset order and are left out.
+    """
+    query = children_query(current_user, name, age, start_date, end_date).filter(
+        Child.created_at.is_not(None)
+    )
+
+    if cursor:
+        created_at, child_id = decode_cursor(cursor, 2)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            created_at = None
+        if created_at is None or not isinstance(child_id, int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            )
+        query = query.filter(
+            tuple_(Child.created_at, Child.id) > (created_at, child_id)
+        )
+
+    return query.order_by(Child.created_at, Child.id)
+
+
+def children_version_query(
+    current_user: UserBase,
+    name: str,
+    age: int,
+    start_date: date,
+    end_date: date,
+):
+    """
+    Select the row count and latest updated_at of the filtered children.
+
+    Any insert, update or delete in the set changes one of them.
+    """
+    return children_query(
+        current_user, name, age, start_date, end_date
+    ).with_only_columns(func.count(Child.id), func.max(Child.updated_at))
+
+
+def children_headers(
+    current_user: UserBase,
+    name: str,
+    age: int,
+    start_date: date,
+    end_date: date,
+    limit: int,
+    cursor: str,
+    version,
+):
+    count, updated_at = version
+    return conditional_headers(
+        (
+            "children",
+            current_user.id,
+            name,
+            age,
+            start_date,
+            end_date,
+            limit,
+            cursor,
+            count,
+            updated_at,
+        ),
+        updated_at,
+    )
+
+
+def children_page(children: list, limit: int):
+    """
+    Trim the limit + 1 rows fetched for a page and build its next cursor.
+    """
+    next_cursor = None
+    if len(children) > limit:
+        children = children[:limit]
+        last = children[-1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+
+    # Serialized like ChildrenList, without validating every row through it
+    content = {
         "status": status.HTTP_200_OK,
-        "data": children,
+        "data": serialize_many(
+            children, Child, CHILD_OUT_FIELDS, native_datetimes=True
+        ),
+        "next_cursor": next_cursor,
     }
+    return ORJSONResponse(content=content, status_code=status.HTTP_200_OK)
+
+
+def children_ndjson(children: list):
+    serializer = compile_serializer(Child, CHILD_OUT_FIELDS, native_datetimes=True)
+    return b"".join(orjson.dumps(serializer(child)) + b"\n" for child in children)
+
+
+def search_children_query(current_user: UserBase, q: str, cursor: str):
+    """
+    Select the current user's children matching every word of `q` as a prefix,
+    with their rank, best first and seeking past the (rank, id) cursor.
+    """
+    tsquery = prefix_tsquery(q)
+    if tsquery is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query must contain a word",
+        )
+
+    rank = func.ts_rank(CHILD_SEARCH_VECTOR, tsquery).label("rank")
+    query = (
+        select(Child, rank)
+        .filter_by(parent_id=current_user.id)
+        .filter(CHILD_SEARCH_VECTOR.bool_op("@@")(tsquery))
+    )
+
+    if cursor:
+        last_rank, child_id = decode_cursor(cursor, 2)
+        if not isinstance(last_rank, (int, float)) or not isinstance(child_id, int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            )
+        # ts_rank is a real: compare at that precision so the cursor row is
+        # equal to itself
+        last_rank = cast(last_rank, REAL)
+        query = query.filter(
+            or_(rank < last_rank, and_(rank == last_rank, Child.id > child_id))
+        )
+
+    return query.order_by(rank.desc(), Child.id)
+
+
+def children_search_page(rows: list, limit: int):
+    """
+    Trim the limit + 1 (child, rank) rows fetched for a page and build its
+    next cursor.
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, last_rank = rows[-1]
+        next_cursor = encode_cursor(last_rank, last.id)
+
+    data = serialize_many(
+        [child for child, _ in rows], Child, CHILD_OUT_FIELDS, native_datetimes=True
+    )
+    for item, (_, rank) in zip(data, rows):
+        item["rank"] = rank
+
+    content = {
+        "status": status.HTTP_200_OK,
+        "data": data,
+        "next_cursor": next_cursor,
+    }
+    return ORJSONResponse(content=content, status_code=status.HTTP_200_OK)
+
+
+def admins_query():
+    return select(User).filter_by(is_superuser=True, is_active=True, is_deleted=False)
+
+
+def child_added_response(child: Child):
+    content = {
+        "status": status.HTTP_201_CREATED,
+        "message": "Your child details have been added.",
+        "data": serialize(child, CHILD_FIELDS),
+    }
+    return ORJSONResponse(content=content, status_code=status.HTTP_201_CREATED)
+
+
+def validate_bulk_children(current_user: UserBase, items: list):
+    """
+    Validate each bulk item against ChildCreate.
+
+    Returns the per-item results with the failures filled in, the rows to
+    insert and the index of the item each row came from.
+    """
+    results = [None] * len(items)
+    rows = []
+    indexes = []
+
+    for index, item in enumerate(items):
+        try:
+            child = ChildCreate.model_validate(item)
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "status": status.HTTP_422_UNPROCESSABLE_ENTITY,
+                "errors": [
+                    {"loc": list(error["loc"]), "msg": error["msg"]}
+                    for error in e.errors()
+                ],
+            }
+            continue
+
+        rows.append(
+            {
+                "parent_id": current_user.id,
+                "name": child.name,
+                "age": child.age,
+                "additional_info": child.additional_info,
+            }
+        )
+        indexes.append(index)
+
+    return results, rows, indexes
+
+
+def bulk_insert_children_query():
+    # Executed with a list of rows: one multi-row INSERT ... RETURNING, with
+    # the returned children in the same order as the rows
+    return insert(Child).returning(Child, sort_by_parameter_order=True)
+
+
+def children_added_response(results: list, children: list, indexes: list):
+    for index, child in zip(indexes, children):
+        results[index] = {
+            "index": index,
+            "status": status.HTTP_201_CREATED,
+            "data": serialize(child, CHILD_FIELDS),
+        }
+
+    if len(children) == len(results):
+        status_code = status.HTTP_201_CREATED
+    elif children:
+        status_code = status.HTTP_207_MULTI_STATUS
+    else:
+        status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    content = {
+        "status": status_code,
+        "message": f"{len(children)} of {len(results)} children have been added.",
+        "data": results,
+    }
+    return ORJSONResponse(content=content, status_code=status_code)
+
+
+def apply_child_update(child: Child, user: ChildUpdate):
+    child.name = user.name if user.name else child.name
+    child.age = user.age if user.age else child.age
+    child.additional_info = (
+        user.additional_info if user.additional_info else child.additional_info
+    )
+
+
+def child_updated_response(child: Child):
+    content = {
+        "status": status.HTTP_200_OK,
+        "message": "Your child details have been updated.",
+        "data": serialize(child, CHILD_UPDATED_FIELDS),
+    }
+    return ORJSONResponse(content=content, status_code=status.HTTP_200_OK)
+
+
+def bulk_update_children_query(current_user: UserBase, items: list):
+    """
+    Build one UPDATE ... FROM (VALUES ...) applying every item.
+
+    Empty fields keep the current value, like apply_child_update. The VALUES
+    columns are cast because Postgres types a column that is NULL in every row
+    as text.
+    """
+    updates = values(
+        column("child_id", BigInteger),
+        column("name", String),
+        column("age", Integer),
+        column("additional_info", String),
+        name="updates",
+    ).data(
+        [
+            (
+                item.child_id,
+                item.name or None,
+                item.age or None,
+                item.additional_info or None,
+            )
+            for item in items
+        ]
+    )
+
+    return (
+        update(Child)
+        .where(
+            Child.id == updates.c.child_id,
+            Child.parent_id == current_user.id,
+            Child.is_deleted.is_(False),
+        )
+        .values(
+            name=func.coalesce(cast(updates.c.name, String), Child.name),
+            age=func.coalesce(cast(updates.c.age, Integer), Child.age),
+            additional_info=func.coalesce(
+                cast(updates.c.additional_info, String), Child.additional_info
+            ),
+        )
+        .returning(Child)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def children_updated_response(items: list, children: list):
+    if not children:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Child not found"
+        )
+
+    updated_ids = {child.id for child in children}
+    not_found = [item.child_id for item in items if item.child_id not in updated_ids]
+
+    content = {
+        "status": status.HTTP_200_OK,
+        "message": f"{len(children)} of {len(items)} children have been updated.",
+        "data": [serialize(child, CHILD_UPDATED_FIELDS) for child in children],
+        "not_found": not_found,
+    }
+    return ORJSONResponse(content=content, status_code=status.HTTP_200_OK)
+
+
+def read_own_children(
+    request: Request,
+    current_user: UserBase,
+    name: str,
+    age: int,
+    start_date: date,
+    end_date: date,
+    limit: int,
+    cursor: str,
+    db: Session,
+):
+    # Answer conditional requests from the aggregate alone
+    version = db.execute(
+        children_version_query(current_user, name, age, start_date, end_date)
+    ).one()
+    headers = children_headers(
+        current_user, name, age, start_date, end_date, limit, cursor, version
+    )
+    if is_not_modified(request, headers):
+        return not_modified_response(headers)
+
+    query = paginated_children_query(
+        current_user, name, age, start_date, end_date, cursor
+    )
+    children = db.execute(query.limit(limit + 1)).scalars().all()
+
+    response = children_page(children, limit)
+    response.headers.update(headers)
+    return response
+
+
+def search_children(
+    current_user: UserBase, q: str, limit: int, cursor: str, db: Session
+):
+    query = search_children_query(current_user, q, cursor)
+    rows = db.execute(query.limit(limit + 1)).all()
+
+    return children_search_page(rows, limit)
+
+
+def stream_own_children(
+    current_user: UserBase,
+    name: str,
+    age: int,
+    start_date: date,
+    end_date: date,
+    cursor: str,
+):
+    """
+    Stream every matching child after the cursor as NDJSON.
+
+    Rows are read from a server-side cursor in batches, so memory stays flat
+    whatever the result size. The generator owns its session because request
+    dependencies are closed before the response body is sent.
+    """
+    query = paginated_children_query(
+        current_user, name, age, start_date, end_date, cursor
+    ).execution_options(yield_per=CHILDREN_STREAM_BATCH_SIZE)
+
+    def generate():
+        with SessionLocal() as db:
+            for children in db.execute(query).scalars().partitions():
+                yield children_ndjson(children)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 def add_child(current_user: UserBase, user: ChildCreate, db: Session):
     child = Child(
-        parent=current_user,
+        parent_id=current_user.id,
         name=user.name,
         age=user.age,
         additional_info=user.additional_info,
     )
     db.add(child)
+    db.flush()
+
+    if CHILD_ADDED_DIGEST_ENABLED:
+        # Admins get one digest for every child added in the window
+        db.execute(child_added_digest_job(child.created_at))
+    else:
+        admins = db.execute(admins_query()).scalars().all()
+        admin_emails = [admin.email for admin in admins]
+
+        # Select the name rather than lazy loading child.parent
+        parent_name = db.scalar(select(User.first_name).filter_by(id=current_user.id))
+
+        # Send mail to admin when a new child is added, committed with the child
+        enqueue_job(
+            db,
+            send_admin_email,
+            (child.name, parent_name, admin_emails),
+            delay_seconds=300,
+        )
     db.commit()
     db.refresh(child)
 
-    admins = (
-        db.query(User)
-        .filter_by(is_superuser=True, is_active=True, is_deleted=False)
-        .all()
-    )
-    admin_emails = [admin.email for admin in admins]
+    return child_added_response(child)
 
-    # Send mail to admin when a new child is added
-    schedule_job(
-        300, send_admin_email, (child.name, child.parent.first_name, admin_emails)
-    )
 
-    content = {
-        "status": status.HTTP_201_CREATED,
-        "message": "Your child details have been added.",
-        "data": child.to_dict(
-            only=("id", "name", "age", "additional_info", "created_at")
-        ),
-    }
-    return JSONResponse(content=content, status_code=status.HTTP_201_CREATED)
+def add_children(current_user: UserBase, items: list, db: Session):
+    results, rows, indexes = validate_bulk_children(current_user, items)
+    if not rows:
+        return children_added_response(results, [], [])
+
+    children = db.execute(bulk_insert_children_query(), rows).scalars().all()
+
+    # One notification for the whole batch, committed with the children
+    if CHILD_ADDED_DIGEST_ENABLED:
+        db.execute(child_added_digest_job(children[0].created_at))
+    else:
+        admins = db.execute(admins_query()).scalars().all()
+        admin_emails = [admin.email for admin in admins]
+        parent_name = db.scalar(select(User.first_name).filter_by(id=current_user.id))
+
+        enqueue_job(
+            db,
+            send_admin_bulk_email,
+            ([child.name for child in children], parent_name, admin_emails),
+            delay_seconds=300,
+        )
+    db.commit()
+
+    return children_added_response(results, children, indexes)
 
 
 def update_child(current_user: UserBase, child_id: int, user: ChildUpdate, db: Session):
     child = (
         db.query(Child)
-        .filter_by(id=child_id, parent=current_user, is_deleted=False)
+        .filter_by(id=child_id, parent_id=current_user.id, is_deleted=False)
         .first()
     )
     if not child:
@@ -86,19 +590,177 @@ def update_child(current_user: UserBase, child_id: int, user: ChildUpdate, db: S
             status_code=status.HTTP_404_NOT_FOUND, detail="Child not found"
         )
 
-    child.name = user.name if user.name else child.name
-    child.age = user.age if user.age else child.age
-    child.additional_info = (
-        user.additional_info if user.additional_info else child.additional_info
-    )
+    apply_child_update(child, user)
     db.commit()
     db.refresh(child)
 
-    content = {
-        "status": status.HTTP_200_OK,
-        "message": "Your child details have been updated.",
-        "data": child.to_dict(
-            only=("id", "name", "age", "additional_info", "created_at", "updated_at")
-        ),
-    }
-    return JSONResponse(content=content, status_code=status.HTTP_200_OK)
+    return child_updated_response(child)
+
+
+def update_children(
+    current_user: UserBase, items: List[ChildBulkUpdateItem], db: Session
+):
+    children = (
+        db.execute(bulk_update_children_query(current_user, items)).scalars().all()
+    )
+    db.commit()
+
+    return children_updated_response(items, children)
+
+
+async def read_own_children_async(
+    request: Request,
+    current_user: UserBase,
+    name: str,
+    age: int,
+    start_date: date,
+    end_date: date,
+    limit: int,
+    cursor: str,
+    db: AsyncSession,
+):
+    # Answer conditional requests from the aggregate alone
+    version = (
+        await db.execute(
+            children_version_query(current_user, name, age, start_date, end_date)
+        )
+    ).one()
+    headers = children_headers(
+        current_user, name, age, start_date, end_date, limit, cursor, version
+    )
+    if is_not_modified(request, headers):
+        return not_modified_response(headers)
+
+    query = paginated_children_query(
+        current_user, name, age, start_date, end_date, cursor
+    )
+    children = (await db.execute(query.limit(limit + 1))).scalars().all()
+
+    response = children_page(children, limit)
+    response.headers.update(headers)
+    return response
+
+
+async def search_children_async(
+    current_user: UserBase, q: str, limit: int, cursor: str, db: AsyncSession
+):
+    query = search_children_query(current_user, q, cursor)
+    rows = (await db.execute(query.limit(limit + 1))).all()
+
+    return children_search_page(rows, limit)
+
+
+def stream_own_children_async(
+    current_user: UserBase,
+    name: str,
+    age: int,
+    start_date: date,
+    end_date: date,
+    cursor: str,
+):
+    query = paginated_children_query(
+        current_user, name, age, start_date, end_date, cursor
+    ).execution_options(yield_per=CHILDREN_STREAM_BATCH_SIZE)
+
+    async def generate():
+        async with AsyncSessionLocal() as db:
+            result = await db.stream_scalars(query)
+            async for children in result.partitions():
+                yield children_ndjson(children)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+async def add_child_async(current_user: UserBase, user: ChildCreate, db: AsyncSession):
+    child = Child(
+        parent_id=current_user.id,
+        name=user.name,
+        age=user.age,
+        additional_info=user.additional_info,
+    )
+    db.add(child)
+    await db.flush()
+
+    if CHILD_ADDED_DIGEST_ENABLED:
+        # Admins get one digest for every child added in the window
+        await db.refresh(child, ["created_at"])
+        await db.execute(child_added_digest_job(child.created_at))
+    else:
+        admins = (await db.execute(admins_query())).scalars().all()
+        admin_emails = [admin.email for admin in admins]
+
+        # Lazy loading child.parent is not allowed under asyncio, select the name
+        parent_name = await db.scalar(
+            select(User.first_name).filter_by(id=current_user.id)
+        )
+
+        # Send mail to admin when a new child is added, committed with the child
+        enqueue_job(
+            db,
+            send_admin_email,
+            (child.name, parent_name, admin_emails),
+            delay_seconds=300,
+        )
+    await db.commit()
+    await db.refresh(child)
+
+    return child_added_response(child)
+
+
+async def add_children_async(current_user: UserBase, items: list, db: AsyncSession):
+    results, rows, indexes = validate_bulk_children(current_user, items)
+    if not rows:
+        return children_added_response(results, [], [])
+
+    children = (await db.execute(bulk_insert_children_query(), rows)).scalars().all()
+
+    # One notification for the whole batch, committed with the children
+    if CHILD_ADDED_DIGEST_ENABLED:
+        await db.execute(child_added_digest_job(children[0].created_at))
+    else:
+        admins = (await db.execute(admins_query())).scalars().all()
+        admin_emails = [admin.email for admin in admins]
+        parent_name = await db.scalar(
+            select(User.first_name).filter_by(id=current_user.id)
+        )
+
+        enqueue_job(
+            db,
+            send_admin_bulk_email,
+            ([child.name for child in children], parent_name, admin_emails),
+            delay_seconds=300,
+        )
+    await db.commit()
+
+    return children_added_response(results, children, indexes)
+
+
+async def update_child_async(
+    current_user: UserBase, child_id: int, user: ChildUpdate, db: AsyncSession
+):
+    result = await db.execute(
+        select(Child).filter_by(
+            id=child_id, parent_id=current_user.id, is_deleted=False
+        )
+    )
+    child = result.scalars().first()
+    if not child:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Child not found"
+        )
+
+    apply_child_update(child, user)
+    await db.commit()
+    await db.refresh(child)
+
+    return child_updated_response(child)
+
+
+async def update_children_async(
+    current_user: UserBase, items: List[ChildBulkUpdateItem], db: AsyncSession
+):
+    result = await db.execute(bulk_update_children_query(current_user, items))
+    children = result.scalars().all()
+    await db.commit()
+
+    return children_updated_response(items, children)
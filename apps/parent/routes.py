@@ -1,56 +1,106 @@
-from fastapi import APIRouter, Depends, Request, File, UploadFile, Form
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from core.database.dependencies import get_database
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database.dependencies import get_database, get_async_database
+from core.query_budget.config import query_budget
 from apps.parent import utils
 from apps.parent.schemas import ParentOut, ParentCreate, ParentProfileUpdate
 from typing import Annotated
 from authentication.schemas import UserBase
-from common.utils.auth import get_current_active_user
-from typing import Optional
+from common.constants import DATABASE_ASYNC_MODE
+from common.utils.auth import get_current_active_user, get_current_active_user_async
 
 
 router = APIRouter(tags=["Parent"])
 
 
-@router.post("/register/", response_model=ParentOut)
-def register(user: ParentCreate, db: Session = Depends(get_database)):
-    return utils.register(user, db)
-
-
-@router.patch("/profile/", response_model=ParentOut)
-def update_parent_profile(
-    request: Request,
-    current_user: Annotated[UserBase, Depends(get_current_active_user)],
-    first_name: Optional[str] = Form(None),
-    last_name: Optional[str] = Form(None),
-    age: Optional[int] = Form(None),
-    address: Optional[str] = Form(None),
-    city: Optional[str] = Form(None),
-    country: Optional[str] = Form(None),
-    pin_code: Optional[str] = Form(None),
-    profile_photo: UploadFile = File(None),
-    db: Session = Depends(get_database),
-):
-
-    return utils.update_parent_profile(
-        request,
-        current_user,
-        first_name,
-        last_name,
-        age,
-        address,
-        city,
-        country,
-        pin_code,
-        profile_photo,
-        db,
+# The profile form is streamed by the handler rather than parsed by FastAPI,
+# so its fields are documented here
+profile_form_schema = ParentProfileUpdate.model_json_schema()
+profile_form_schema["properties"]["profile_photo"] = {
+    "type": "string",
+    "format": "binary",
+}
+profile_form_openapi = {
+    "requestBody": {
+        "content": {"multipart/form-data": {"schema": profile_form_schema}},
+    }
+}
+
+
+if DATABASE_ASYNC_MODE:
+
+    @router.post("/register/", response_model=ParentOut)
+    @query_budget(3)
+    async def register(
+        user: ParentCreate, db: AsyncSession = Depends(get_async_database)
+    ):
+        return await utils.register_async(user, db)
+
+    @router.patch(
+        "/profile/", response_model=ParentOut, openapi_extra=profile_form_openapi
+    )
+    @query_budget(5)
+    async def update_parent_profile(
+        request: Request,
+        current_user: Annotated[UserBase, Depends(get_current_active_user_async)],
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        # Return the connection used to look up the user to the pool while a
+        # possibly slow upload streams; the session reconnects for the update
+        await db.close()
+        profile, profile_photo = await utils.read_profile_form(request)
+
+        return await utils.update_parent_profile_async(
+            request, current_user, profile, profile_photo, db
+        )
+
+    @router.get("/profile/", response_model=ParentOut)
+    @query_budget(3)
+    async def get_parent_profile(
+        request: Request,
+        current_user: Annotated[UserBase, Depends(get_current_active_user_async)],
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.get_parent_profile_async(request, current_user, db)
+
+else:
+
+    @router.post("/register/", response_model=ParentOut)
+    @query_budget(3)
+    def register(user: ParentCreate, db: Session = Depends(get_database)):
+        return utils.register(user, db)
+
+    @router.patch(
+        "/profile/", response_model=ParentOut, openapi_extra=profile_form_openapi
     )
+    @query_budget(5)
+    async def update_parent_profile(
+        request: Request,
+        current_user: Annotated[UserBase, Depends(get_current_active_user)],
+        db: Session = Depends(get_database),
+    ):
+        # The upload is streamed on the event loop, only the database update
+        # takes a worker thread. The connection used to look up the user goes
+        # back to the pool meanwhile; the session reconnects for the update
+        await run_in_threadpool(db.close)
+        profile, profile_photo = await utils.read_profile_form(request)
 
+        return await run_in_threadpool(
+            utils.update_parent_profile,
+            request,
+            current_user,
+            profile,
+            profile_photo,
+            db,
+        )
 
-@router.get("/profile/", response_model=ParentOut)
-def get_parent_profile(
-    request: Request,
-    current_user: Annotated[UserBase, Depends(get_current_active_user)],
-    db: Session = Depends(get_database),
-):
-    return utils.get_parent_profile(request, current_user, db)
+    @router.get("/profile/", response_model=ParentOut)
+    @query_budget(3)
+    def get_parent_profile(
+        request: Request,
+        current_user: Annotated[UserBase, Depends(get_current_active_user)],
+        db: Session = Depends(get_database),
+    ):
+        return utils.get_parent_profile(request, current_user, db)
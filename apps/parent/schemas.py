@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, root_validator, validator
-from typing import Optional
+from typing import Dict, Optional
 import re
 
 
@@ -15,6 +15,7 @@ class ParentBase(BaseModel):
     country: Optional[str] = None
     pin_code: Optional[str] = None
     profile_photo: Optional[str] = None
+    profile_photo_variants: Optional[Dict[str, Dict[str, str]]] = None
 
 
 class ParentOut(ParentBase):
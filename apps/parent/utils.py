@@ -1,12 +1,34 @@
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from common.models import User
+from common.serializers import serialize
+from common.utils.conditional import (
+    conditional_headers,
+    is_not_modified,
+    not_modified_response,
+)
 from apps.parent.schemas import ParentCreate, ParentProfileUpdate
 from common.utils.emails import send_activation_email
-from fastapi.responses import JSONResponse
-from fastapi import HTTPException, status, Request, UploadFile
-from common.utils.auth import get_password_hash, create_activation_token
-from authentication.schemas import UserBase
-import shutil, uuid, os
+from fastapi.responses import ORJSONResponse
+from fastapi import HTTPException, status, Request
+from common.utils.auth import (
+    get_password_hash,
+    get_password_hash_async,
+    Principal,
+    create_activation_token,
+)
+from common.constants import PROFILE_PHOTO_MAX_SIZE
+from common.utils.uploads import StreamedFile, StreamingFormParser
+from core.images.config import image_processor, image_variant_paths
+from core.media.config import media_url
+from typing import Optional
+import os
+
+
+PROFILE_PHOTO_DIR = "media/profile"
 
 
 def check_existing_user(user, db):
@@ -28,7 +50,15 @@ def check_existing_user(user, db):
     """
     # Query the database for a user with the given email
     existing_user = db.query(User).filter_by(email=user.email).first()
+    validate_existing_user(existing_user)
+
+
+def validate_existing_user(existing_user):
+    """
+    Raise the matching HTTPException when a registration email is already taken.
 
+    Shared by the sync and async registration paths.
+    """
     if existing_user:
         # Check if the user's account is marked as deleted
         if existing_user.is_deleted:
@@ -58,6 +88,14 @@ def check_existing_user(user, db):
         )
 
 
+def registered_response():
+    content = {
+        "status": status.HTTP_201_CREATED,
+        "message": "Your account has been created. Please check your email to activate your account.",
+    }
+    return ORJSONResponse(content=content, status_code=status.HTTP_201_CREATED)
+
+
 def register(user: ParentCreate, db: Session):
     # Check if user already exists
     check_existing_user(user, db)
@@ -81,27 +119,28 @@ def register(user: ParentCreate, db: Session):
     # Send activation email
     send_activation_email(parent, activation_token)
 
-    content = {
-        "status": status.HTTP_201_CREATED,
-        "message": "Your account has been created. Please check your email to activate your account.",
-    }
-    return JSONResponse(content=content, status_code=status.HTTP_201_CREATED)
+    return registered_response()
 
 
-def update_parent_profile(
-    request: Request,
-    current_user: UserBase,
-    first_name: str,
-    last_name: str,
-    age: int,
-    address: str,
-    city: str,
-    country: str,
-    pin_code: str,
-    profile_photo: UploadFile,
-    db: Session,
+def get_base_url(request: Request):
+    return (
+        str(request.url.scheme)
+        + "://"
+        + str(request.url.hostname)
+        + (f":{request.url.port}" if request.url.port else "")
+    )
+
+
+def apply_profile_update(
+    parent: User,
+    first_name: str = None,
+    last_name: str = None,
+    age: int = None,
+    address: str = None,
+    city: str = None,
+    country: str = None,
+    pin_code: str = None,
 ):
-    parent = current_user
     if first_name is not None:
         parent.first_name = first_name
     if last_name is not None:
@@ -117,36 +156,101 @@ def update_parent_profile(
     if pin_code is not None:
         parent.pin_code = pin_code
 
-    if profile_photo is not None:
-        # Ensure the photos directory exists
-        os.makedirs("media/profile", exist_ok=True)
 
-        # Generate a unique filename and define the path
-        photo_filename = f"{uuid.uuid4()}.jpg"
-        photo_path = f"media/profile/{photo_filename}"
+async def read_profile_form(request: Request):
+    """
+    Stream the profile form, saving the photo to disk as it is received.
 
-        # Save the uploaded file
-        with open(photo_path, "wb") as buffer:
-            shutil.copyfileobj(profile_photo.file, buffer)
+    Returns the validated fields and the saved photo path, if one was sent.
+    """
+    parser = StreamingFormParser(
+        request, "profile_photo", PROFILE_PHOTO_DIR, PROFILE_PHOTO_MAX_SIZE
+    )
+    fields, upload = await parser.parse()
 
-        parent.profile_photo = photo_path
+    try:
+        # Empty form values mean "not provided", as with Form(None)
+        profile = ParentProfileUpdate(
+            **{name: value for name, value in fields.items() if value != ""}
+        )
+    except ValidationError as e:
+        if upload is not None:
+            os.remove(upload.path)
+        raise RequestValidationError(e.errors())
 
-    db.commit()
-    db.refresh(parent)
+    profile_photo = await store_profile_photo(upload) if upload is not None else None
 
-    base_url = (
-        str(request.url.scheme)
-        + "://"
-        + str(request.url.hostname)
-        + (f":{request.url.port}" if request.url.port else "")
-    )
-    # Construct the photo URL
-    profile_photo_url = (
-        f"{base_url}/{parent.profile_photo}" if parent.profile_photo else None
+    return profile, profile_photo
+
+
+async def store_profile_photo(upload: StreamedFile) -> str:
+    """
+    Move an uploaded photo to its content-addressed path and generate its
+    derivatives in the image process pool.
+
+    An identical photo that is already stored is reused as is.
+    """
+    path = os.path.join(PROFILE_PHOTO_DIR, f"{upload.sha256}.{upload.extension}")
+    variant_paths = [
+        variant_path
+        for paths in image_variant_paths(path).values()
+        for variant_path in paths.values()
+    ]
+
+    if os.path.exists(path):
+        os.remove(upload.path)
+        if all(os.path.exists(variant_path) for variant_path in variant_paths):
+            return path
+        created = False
+    else:
+        os.replace(upload.path, path)
+        created = True
+
+    try:
+        await image_processor.generate_variants(path)
+    except Exception:
+        # The sniffed header was valid but the image itself cannot be decoded
+        if created:
+            os.remove(path)
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Profile photo could not be read as an image",
+        )
+
+    return path
+
+
+def profile_photo_urls(request: Request, parent: User):
+    """
+    Return the immutable URLs of the original photo and of its derivatives.
+    """
+    if not parent.profile_photo:
+        return None, None
+
+    base_url = get_base_url(request)
+    variant_paths = image_variant_paths(parent.profile_photo)
+    variant_urls = (
+        {
+            variant: {
+                extension: media_url(base_url, path)
+                for extension, path in paths.items()
+            }
+            for variant, paths in variant_paths.items()
+        }
+        if variant_paths
+        else None
     )
 
-    parent_data = parent.to_dict(
-        only=(
+    return media_url(base_url, parent.profile_photo), variant_urls
+
+
+def profile_updated_response(request: Request, parent: User):
+    # Construct the photo URLs
+    profile_photo_url, profile_photo_variants = profile_photo_urls(request, parent)
+
+    parent_data = serialize(
+        parent,
+        (
             "id",
             "first_name",
             "last_name",
@@ -155,39 +259,73 @@ def update_parent_profile(
             "city",
             "country",
             "pin_code",
-        )
+        ),
     )
     parent_data["profile_photo"] = profile_photo_url
+    parent_data["profile_photo_variants"] = profile_photo_variants
 
     content = {
         "status": status.HTTP_201_CREATED,
         "message": "Profile updated successfully.",
         "data": parent_data,
     }
-    return JSONResponse(content=content, status_code=status.HTTP_201_CREATED)
+    return ORJSONResponse(content=content, status_code=status.HTTP_201_CREATED)
+
+
+def update_parent_profile(
+    request: Request,
+    current_user: Principal,
+    profile: ParentProfileUpdate,
+    profile_photo: Optional[str],
+    db: Session,
+):
+    parent = current_user.load(db)
+    apply_profile_update(parent, **profile.model_dump())
+
+    # The photo has already been streamed to disk by read_profile_form
+    if profile_photo is not None:
+        parent.profile_photo = profile_photo
+
+    db.commit()
+    db.refresh(parent)
+
+    return profile_updated_response(request, parent)
 
 
 def get_parent_profile(
     request: Request,
-    current_user: UserBase,
+    current_user: Principal,
     db: Session,
 ):
+    # Answer conditional requests from the version column alone
+    updated_at = db.scalar(profile_version_query(current_user))
+    headers = profile_headers(request, current_user, updated_at)
+    if is_not_modified(request, headers):
+        return not_modified_response(headers)
 
-    base_url = (
-        str(request.url.scheme)
-        + "://"
-        + str(request.url.hostname)
-        + (f":{request.url.port}" if request.url.port else "")
-    )
-    # Construct the photo URL
-    profile_photo_url = (
-        f"{base_url}/{current_user.profile_photo}"
-        if current_user.profile_photo
-        else None
+    response = profile_response(request, current_user.load(db))
+    response.headers.update(headers)
+    return response
+
+
+def profile_version_query(current_user: Principal):
+    return select(User.updated_at).filter_by(id=current_user.id)
+
+
+def profile_headers(request: Request, current_user: Principal, updated_at):
+    # Photo URLs embed the base URL, so it is part of the representation
+    return conditional_headers(
+        ("profile", current_user.id, get_base_url(request), updated_at), updated_at
     )
 
-    data = current_user.to_dict(
-        only=(
+
+def profile_response(request: Request, parent: User):
+    # Construct the photo URLs
+    profile_photo_url, profile_photo_variants = profile_photo_urls(request, parent)
+
+    data = serialize(
+        parent,
+        (
             "id",
             "first_name",
             "last_name",
@@ -197,13 +335,74 @@ def get_parent_profile(
             "country",
             "pin_code",
             "is_superuser",
-        )
+        ),
     )
     data["profile_photo"] = profile_photo_url
+    data["profile_photo_variants"] = profile_photo_variants
 
     content = {
         "status": status.HTTP_201_CREATED,
         "message": "Profile updated successfully.",
         "data": data,
     }
-    return JSONResponse(content=content, status_code=status.HTTP_201_CREATED)
+    return ORJSONResponse(content=content, status_code=status.HTTP_201_CREATED)
+
+
+async def register_async(user: ParentCreate, db: AsyncSession):
+    # Check if user already exists
+    result = await db.execute(select(User).filter_by(email=user.email))
+    validate_existing_user(result.scalars().first())
+
+    # Hashing is CPU bound, it runs in the password hasher's process pool
+    hashed_password = await get_password_hash_async(user.password)
+    parent = User(
+        email=user.email,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        password=hashed_password,
+        is_parent=True,
+    )
+    db.add(parent)
+    await db.commit()
+    await db.refresh(parent)
+
+    activation_token = create_activation_token({"sub": parent.id})
+
+    # Send activation email
+    send_activation_email(parent, activation_token)
+
+    return registered_response()
+
+
+async def update_parent_profile_async(
+    request: Request,
+    current_user: Principal,
+    profile: ParentProfileUpdate,
+    profile_photo: Optional[str],
+    db: AsyncSession,
+):
+    parent = await current_user.load_async(db)
+    apply_profile_update(parent, **profile.model_dump())
+
+    if profile_photo is not None:
+        parent.profile_photo = profile_photo
+
+    await db.commit()
+    await db.refresh(parent)
+
+    return profile_updated_response(request, parent)
+
+
+async def get_parent_profile_async(
+    request: Request,
+    current_user: Principal,
+    db: AsyncSession,
+):
+    updated_at = await db.scalar(profile_version_query(current_user))
+    headers = profile_headers(request, current_user, updated_at)
+    if is_not_modified(request, headers):
+        return not_modified_response(headers)
+
+    response = profile_response(request, await current_user.load_async(db))
+    response.headers.update(headers)
+    return response
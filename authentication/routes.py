@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from core.database.dependencies import get_database
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database.dependencies import get_database, get_async_database
+from core.query_budget.config import query_budget
 from fastapi.responses import JSONResponse
 from authentication import utils
 from authentication.schemas import (
@@ -10,30 +12,58 @@ from authentication.schemas import (
     ActivateAccountRequest,
     ResendActivationLinkRequest,
 )
+from common.constants import DATABASE_ASYNC_MODE
 
 
 router = APIRouter(tags=["Auth"])
 
 
-@router.post("/login/", response_model=LoginOut)
-def login(user: UserLogin, db: Session = Depends(get_database)):
-    return utils.login(user, db)
+if DATABASE_ASYNC_MODE:
 
+    @router.post("/login/", response_model=LoginOut)
+    @query_budget(2)
+    async def login(user: UserLogin, db: AsyncSession = Depends(get_async_database)):
+        return await utils.login_async(user, db)
 
-@router.post("/refresh/", response_class=JSONResponse)
-def refresh(request: RefreshTokenRequest, db: Session = Depends(get_database)):
-    return utils.refresh(request, db)
+    @router.post("/activate/", response_class=JSONResponse)
+    @query_budget(2)
+    async def activate_account(
+        request: ActivateAccountRequest,
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.activate_account_async(request, db)
+
+    @router.post("/activate/resend/", response_class=JSONResponse)
+    @query_budget(1)
+    async def resend_activation_link(
+        request: ResendActivationLinkRequest,
+        db: AsyncSession = Depends(get_async_database),
+    ):
+        return await utils.resend_activation_link_async(request, db)
+
+else:
 
+    @router.post("/login/", response_model=LoginOut)
+    @query_budget(2)
+    def login(user: UserLogin, db: Session = Depends(get_database)):
+        return utils.login(user, db)
 
-@router.post("/activate/", response_class=JSONResponse)
-def activate_account(
-    request: ActivateAccountRequest, db: Session = Depends(get_database)
-):
-    return utils.activate_account(request, db)
+    @router.post("/activate/", response_class=JSONResponse)
+    @query_budget(2)
+    def activate_account(
+        request: ActivateAccountRequest, db: Session = Depends(get_database)
+    ):
+        return utils.activate_account(request, db)
 
+    @router.post("/activate/resend/", response_class=JSONResponse)
+    @query_budget(1)
+    def resend_activation_link(
+        request: ResendActivationLinkRequest, db: Session = Depends(get_database)
+    ):
+        return utils.resend_activation_link(request, db)
 
-@router.post("/activate/resend/", response_class=JSONResponse)
-def resend_activation_link(
-    request: ResendActivationLinkRequest, db: Session = Depends(get_database)
-):
-    return utils.resend_activation_link(request, db)
+
+@router.post("/refresh/", response_class=JSONResponse)
+@query_budget(0)
+def refresh(request: RefreshTokenRequest, db: Session = Depends(get_database)):
+    return utils.refresh(request, db)
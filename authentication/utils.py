@@ -1,7 +1,10 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from common.models import User
+from common.serializers import serialize
 from common.utils.emails import send_activation_email
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi import HTTPException, status
 from common.utils.auth import create_activation_token
 from authentication.schemas import (
@@ -13,20 +16,31 @@ from authentication.schemas import (
 from common.utils.auth import (
     create_access_token,
     create_refresh_token,
-    verify_password,
+    verify_and_update_password,
+    verify_and_update_password_async,
     verify_token,
 )
 
 
 def check_existing_user(user, db):
     existing_user = db.query(User).filter_by(email=user.email).first()
+
+    new_hash = None
     if existing_user:
-        if not verify_password(user.password, existing_user.password):
+        verified, new_hash = verify_and_update_password(
+            user.password, existing_user.password
+        )
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
             )
 
+    return validate_login_user(existing_user), new_hash
+
+
+def validate_login_user(existing_user):
+    if existing_user:
         if existing_user.is_deleted:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -50,13 +64,26 @@ def check_existing_user(user, db):
 
 def login(user: UserLogin, db: Session):
     # Validate user
-    db_user = check_existing_user(user, db)
+    db_user, new_hash = check_existing_user(user, db)
+
+    # Built before the commit expires db_user, which would reload it
+    response = login_response(db_user)
+
+    # Store the password again under the current hashing policy
+    if new_hash:
+        db_user.password = new_hash
+        db.commit()
+
+    return response
 
+
+def login_response(db_user: User):
     access_token = create_access_token(data={"sub": db_user.id})
     refresh_token = create_refresh_token(data={"sub": db_user.id})
 
-    user_dict = db_user.to_dict(
-        only=(
+    user_dict = serialize(
+        db_user,
+        (
             "id",
             "email",
             "first_name",
@@ -69,7 +96,7 @@ def login(user: UserLogin, db: Session):
             "profile_photo",
             "is_superuser",
             "is_parent",
-        )
+        ),
     )
 
     content = {
@@ -78,7 +105,7 @@ def login(user: UserLogin, db: Session):
         "refresh_token": refresh_token,
         "data": user_dict,
     }
-    return JSONResponse(content=content, status_code=status.HTTP_200_OK)
+    return ORJSONResponse(content=content, status_code=status.HTTP_200_OK)
 
 
 def refresh(request: RefreshTokenRequest, db: Session):
@@ -96,12 +123,12 @@ def refresh(request: RefreshTokenRequest, db: Session):
             "token_type": "access",
             "token": new_access_token,
         }
-        return JSONResponse(content=content, status_code=status.HTTP_200_OK)
+        return ORJSONResponse(content=content, status_code=status.HTTP_200_OK)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
 
-def activate_account(request: ActivateAccountRequest, db: Session):
+def activation_user_id(request: ActivateAccountRequest):
     payload = verify_token(request.token, token_type="activation")
     user_id = payload.get("sub")
     if not user_id:
@@ -109,8 +136,10 @@ def activate_account(request: ActivateAccountRequest, db: Session):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid activation token",
         )
+    return user_id
 
-    db_user = db.query(User).filter_by(id=user_id).first()
+
+def validate_inactive_user(db_user: User):
     if db_user.is_deleted:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -123,14 +152,25 @@ def activate_account(request: ActivateAccountRequest, db: Session):
             detail="Your account is already active. Please login.",
         )
 
-    db_user.is_active = True
-    db.commit()
 
+def account_activated_response():
     content = {
         "status": status.HTTP_200_OK,
         "message": "Account activated successfully. You can now login.",
     }
-    return JSONResponse(content=content, status_code=status.HTTP_200_OK)
+    return ORJSONResponse(content=content, status_code=status.HTTP_200_OK)
+
+
+def activate_account(request: ActivateAccountRequest, db: Session):
+    user_id = activation_user_id(request)
+
+    db_user = db.query(User).filter_by(id=user_id).first()
+    validate_inactive_user(db_user)
+
+    db_user.is_active = True
+    db.commit()
+
+    return account_activated_response()
 
 
 def resend_activation_link(request: ResendActivationLinkRequest, db: Session):
@@ -141,18 +181,12 @@ def resend_activation_link(request: ResendActivationLinkRequest, db: Session):
             detail="User with this email does not exist",
         )
 
-    if db_user.is_deleted:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Your account has been deactivated. Please contact support.",
-        )
+    validate_inactive_user(db_user)
+
+    return send_activation_link(db_user)
 
-    if db_user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Your account is already active. Please login.",
-        )
 
+def send_activation_link(db_user: User):
     activation_token = create_activation_token({"sub": db_user.id})
     send_activation_email(db_user, activation_token)
 
@@ -160,4 +194,59 @@ def resend_activation_link(request: ResendActivationLinkRequest, db: Session):
         "status": status.HTTP_200_OK,
         "message": "Activation link sent to your email.",
     }
-    return JSONResponse(content=content, status_code=status.HTTP_200_OK)
+    return ORJSONResponse(content=content, status_code=status.HTTP_200_OK)
+
+
+async def login_async(user: UserLogin, db: AsyncSession):
+    result = await db.execute(select(User).filter_by(email=user.email))
+    existing_user = result.scalars().first()
+
+    new_hash = None
+    if existing_user:
+        verified, new_hash = await verify_and_update_password_async(
+            user.password, existing_user.password
+        )
+        if not verified:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid credentials",
+            )
+
+    db_user = validate_login_user(existing_user)
+    response = login_response(db_user)
+
+    # Store the password again under the current hashing policy
+    if new_hash:
+        db_user.password = new_hash
+        await db.commit()
+
+    return response
+
+
+async def activate_account_async(request: ActivateAccountRequest, db: AsyncSession):
+    user_id = activation_user_id(request)
+
+    result = await db.execute(select(User).filter_by(id=user_id))
+    db_user = result.scalars().first()
+    validate_inactive_user(db_user)
+
+    db_user.is_active = True
+    await db.commit()
+
+    return account_activated_response()
+
+
+async def resend_activation_link_async(
+    request: ResendActivationLinkRequest, db: AsyncSession
+):
+    result = await db.execute(select(User).filter_by(email=request.email))
+    db_user = result.scalars().first()
+    if not db_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email does not exist",
+        )
+
+    validate_inactive_user(db_user)
+
+    return send_activation_link(db_user)
@@ -0,0 +1,127 @@
+"""
+Compare requests/sec of the sync (threadpool) and async database modes.
+
+The script starts the app twice with uvicorn, once with DATABASE_ASYNC_MODE
+disabled and once enabled, logs in with an existing active account and drives
+GET /api/child/ at fixed concurrency levels.
+
+Usage:
+    python -m benchmarks.async_vs_sync --email parent@example.com --password Secret@123
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+CONCURRENCY_LEVELS = (50, 200, 1000)
+
+
+def start_server(port: int, async_mode: bool) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_ASYNC_MODE=str(async_mode))
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+async def login(base_url: str, email: str, password: str) -> str:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.post(
+            "/api/login/", json={"email": email, "password": password}
+        )
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+
+async def run_level(
+    base_url: str, token: str, concurrency: int, duration: float
+) -> float:
+    limits = httpx.Limits(max_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    completed = 0
+    deadline = time.monotonic() + duration
+
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=60
+    ) as client:
+
+        async def worker():
+            nonlocal completed
+            while time.monotonic() < deadline:
+                response = await client.get("/api/child/")
+                if response.status_code == 200:
+                    completed += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    return completed / elapsed
+
+
+async def benchmark_mode(args, async_mode: bool) -> dict:
+    port = args.port + (1 if async_mode else 0)
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(port, async_mode)
+    try:
+        await wait_until_ready(base_url)
+        token = await login(base_url, args.email, args.password)
+        results = {}
+        for concurrency in CONCURRENCY_LEVELS:
+            results[concurrency] = await run_level(
+                base_url, token, concurrency, args.duration
+            )
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    sync_results = await benchmark_mode(args, async_mode=False)
+    async_results = await benchmark_mode(args, async_mode=True)
+
+    print(f"{'clients':>8} {'sync req/s':>12} {'async req/s':>12}")
+    for concurrency in CONCURRENCY_LEVELS:
+        print(
+            f"{concurrency:>8} {sync_results[concurrency]:>12.1f}"
+            f" {async_results[concurrency]:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Measure email delivery throughput against a local aiosmtpd sink.
+
+Compares the previous per-message behaviour (a new SMTP connection for every
+message) with the pooled delivery engine from core.email.config.
+
+Usage:
+    python -m benchmarks.email_delivery --messages 500
+"""
+
+import argparse
+import smtplib
+import time
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
+
+from core.email.config import (
+    EMAIL_HOST_SENDER,
+    EmailDeliveryEngine,
+    EmailMessage,
+    SMTPConnectionPool,
+)
+
+
+def build_messages(count: int) -> list:
+    return [
+        EmailMessage(
+            "Child added", "<p>Benchmark</p>", EMAIL_HOST_SENDER, f"admin{i}@example.com"
+        )
+        for i in range(count)
+    ]
+
+
+def connection_per_message(host: str, port: int, messages: list) -> float:
+    started = time.perf_counter()
+    for message in messages:
+        with smtplib.SMTP(host, port) as server:
+            server.send_message(message.create_message())
+    return len(messages) / (time.perf_counter() - started)
+
+
+def pooled(host: str, port: int, messages: list, size: int, batch_size: int) -> float:
+    pool = SMTPConnectionPool(host, port, use_tls=False, size=size)
+    engine = EmailDeliveryEngine(pool, batch_size=batch_size)
+    started = time.perf_counter()
+    engine.submit(messages)
+    engine.shutdown()
+    return len(messages) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--pool-size", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    controller = Controller(Sink(), hostname="127.0.0.1", port=args.port)
+    controller.start()
+    try:
+        messages = build_messages(args.messages)
+        before = connection_per_message("127.0.0.1", args.port, messages)
+        after = pooled(
+            "127.0.0.1", args.port, messages, args.pool_size, args.batch_size
+        )
+    finally:
+        controller.stop()
+
+    print(f"connection per message: {before:>10.1f} messages/sec")
+    print(f"pooled delivery engine: {after:>10.1f} messages/sec")
+
+
+if __name__ == "__main__":
+    main()
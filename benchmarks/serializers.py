@@ -0,0 +1,103 @@
+"""
+Micro-benchmark of serializing large child lists (rows/sec).
+
+Compares the previous response paths with the compiled serializers encoded
+by orjson:
+
+- to_dict + json: SerializerMixin.to_dict(only=...) encoded by the stdlib json,
+  as the single-child responses were built
+- pydantic ChildrenList: response_model validation and dump, as the
+  children listing was built
+- compiled + orjson, in both datetime styles
+
+Usage:
+    python -m benchmarks.serializers --rows 10000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import orjson
+
+from apps.child.schemas import ChildrenList
+from apps.child.utils import CHILD_FIELDS, CHILD_OUT_FIELDS
+from common.models import Child
+from common.serializers import serialize_many
+
+
+def build_children(count: int) -> list:
+    created_at = datetime(2024, 1, 1)
+    return [
+        Child(
+            id=i,
+            parent_id=1,
+            name=f"Child {i}",
+            age=i % 18 + 1,
+            additional_info="Example additional info",
+            created_at=created_at + timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+def rows_per_sec(func, children: list, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(children)
+    return len(children) * repeat / (time.perf_counter() - started)
+
+
+def to_dict_json(children: list) -> bytes:
+    data = [child.to_dict(only=CHILD_FIELDS) for child in children]
+    return json.dumps(
+        {"status": 200, "data": data}, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def pydantic_list(children: list) -> bytes:
+    return ChildrenList.model_validate(
+        {"status": 200, "data": children, "next_cursor": None}
+    ).model_dump_json().encode()
+
+
+def compiled_orjson(children: list) -> bytes:
+    return orjson.dumps(
+        {"status": 200, "data": serialize_many(children, Child, CHILD_FIELDS)}
+    )
+
+
+def compiled_native_orjson(children: list) -> bytes:
+    return orjson.dumps(
+        {
+            "status": 200,
+            "data": serialize_many(
+                children, Child, CHILD_OUT_FIELDS, native_datetimes=True
+            ),
+            "next_cursor": None,
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    children = build_children(args.rows)
+    results = {
+        "to_dict + json": rows_per_sec(to_dict_json, children, args.repeat),
+        "compiled + orjson": rows_per_sec(compiled_orjson, children, args.repeat),
+        "pydantic ChildrenList": rows_per_sec(pydantic_list, children, args.repeat),
+        "compiled native + orjson": rows_per_sec(
+            compiled_native_orjson, children, args.repeat
+        ),
+    }
+    for label, value in results.items():
+        print(f"{label:<26} {value:>12.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
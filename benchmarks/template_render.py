@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of email template rendering (renders/sec).
+
+Compares reading and compiling the file for every render (the previous
+render_html_content) with the compiled TemplateRegistry, one render at a time
+and in batches through render_many.
+
+Usage:
+    python -m benchmarks.template_render --renders 100000
+"""
+
+import argparse
+import os
+import time
+from string import Template
+
+from core.email.config import EMAIL_TEMPLATES_DIR, TemplateRegistry
+
+
+TEMPLATE_NAME = "child_added.html"
+
+
+def variables(count: int) -> list:
+    return [
+        {"name": f"Child {i}", "parent_name": f"Parent {i}"} for i in range(count)
+    ]
+
+
+def read_per_render(variables_list: list) -> float:
+    path = os.path.join(EMAIL_TEMPLATES_DIR, TEMPLATE_NAME)
+    started = time.perf_counter()
+    for item in variables_list:
+        with open(path, "r") as file:
+            Template(file.read()).substitute(**item)
+    return len(variables_list) / (time.perf_counter() - started)
+
+
+def registry_render(registry: TemplateRegistry, variables_list: list) -> float:
+    started = time.perf_counter()
+    for item in variables_list:
+        registry.render(TEMPLATE_NAME, item)
+    return len(variables_list) / (time.perf_counter() - started)
+
+
+def registry_render_many(registry: TemplateRegistry, variables_list: list) -> float:
+    started = time.perf_counter()
+    registry.render_many(TEMPLATE_NAME, variables_list)
+    return len(variables_list) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--renders", type=int, default=100000)
+    args = parser.parse_args()
+
+    variables_list = variables(args.renders)
+    registry = TemplateRegistry(EMAIL_TEMPLATES_DIR)
+    registry.load()
+    reloading = TemplateRegistry(EMAIL_TEMPLATES_DIR, reload=True)
+    reloading.load()
+
+    results = {
+        "read + compile per render": read_per_render(variables_list),
+        "registry render": registry_render(registry, variables_list),
+        "registry render (debug)": registry_render(reloading, variables_list),
+        "registry render_many": registry_render_many(registry, variables_list),
+    }
+    for label, renders_per_sec in results.items():
+        print(f"{label:<26} {renders_per_sec:>12.0f} renders/sec")
+
+
+if __name__ == "__main__":
+    main()
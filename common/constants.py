@@ -5,9 +5,20 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+
+def get_bool_env(name: str, default: bool = False) -> bool:
+    """
+    Read a boolean flag from the environment ("true", "1" or "yes" enable it).
+    """
+    return os.getenv(name, str(default)).lower() in ("true", "1", "yes")
+
+
 # Retrieve secret key
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+# Debug mode (e.g. reload email templates when their files change)
+DEBUG = get_bool_env("DEBUG")
+
 # Retrieve environment variables
 DB_USERNAME = os.getenv("DB_USERNAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
@@ -15,13 +26,92 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
-# Construct the DATABASE_URL
-DATABASE_URL = (
+# Construct the DATABASE_URL (a full URL in DATABASE_URL takes precedence)
+DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"postgresql+psycopg2://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# Opt-in asyncio database mode (asyncpg driver, AsyncSession dependency)
+DATABASE_ASYNC_MODE = get_bool_env("DATABASE_ASYNC_MODE")
+
+# Construct the ASYNC_DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    f"postgresql+asyncpg://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# Optional read replicas (comma separated URLs). GET requests read from a
+# replica lagging at most DATABASE_REPLICA_MAX_LAG seconds, except for clients
+# who wrote within the last DATABASE_REPLICA_STICKY_SECONDS.
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+ASYNC_DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("ASYNC_DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+] or [url.replace("+psycopg2", "+asyncpg", 1) for url in DATABASE_REPLICA_URLS]
+DATABASE_REPLICA_MAX_LAG = float(os.getenv("DATABASE_REPLICA_MAX_LAG", "2.0"))
+DATABASE_REPLICA_CHECK_INTERVAL = float(
+    os.getenv("DATABASE_REPLICA_CHECK_INTERVAL", "1.0")
+)
+DATABASE_REPLICA_STICKY_SECONDS = float(
+    os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "5.0")
+)
+
 # Retrieve email credentials
 EMAIL_HOST = os.getenv("EMAIL_HOST")
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 EMAIL_PORT = os.getenv("EMAIL_PORT")
+EMAIL_USE_TLS = get_bool_env("EMAIL_USE_TLS", True)
+
+# Pooled SMTP delivery (connections kept alive, messages sent per session)
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "3"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+
+# Authenticated principal cache (entries, seconds)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+# Verified access token cache (entries, each kept until the token expires)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# Durable job queue (worker threads per process, seconds)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF = int(os.getenv("JOB_RETRY_BACKOFF", "30"))
+
+# Coalesce "child added" admin emails into one digest per window (seconds)
+CHILD_ADDED_DIGEST_ENABLED = get_bool_env("CHILD_ADDED_DIGEST_ENABLED")
+CHILD_ADDED_DIGEST_WINDOW = int(os.getenv("CHILD_ADDED_DIGEST_WINDOW", "300"))
+CHILD_ADDED_DIGEST_MAX_ITEMS = int(os.getenv("CHILD_ADDED_DIGEST_MAX_ITEMS", "100"))
+
+# Profile photo uploads (largest accepted file, bytes)
+PROFILE_PHOTO_MAX_SIZE = int(os.getenv("PROFILE_PHOTO_MAX_SIZE", str(5 * 1024 * 1024)))
+
+# Profile photo derivatives (worker processes)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# Password hashing (pbkdf2_sha256 rounds, worker processes, queued requests)
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+# Per-request timings in a Server-Timing header and an access log line
+# (toggled at runtime with SIGUSR1)
+INSTRUMENTATION_ENABLED = get_bool_env("INSTRUMENTATION_ENABLED")
+
+# Prometheus multiprocess mode: one directory shared by all uvicorn workers,
+# emptied before the server starts (unset with a single worker)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Per-route query budgets for development and tests: "off", "log" (log routes
+# over budget and watched lazy loads) or "raise" (fail those requests)
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off").lower()
+
+# Admin analytics materialized views refresh interval (seconds, 0 disables it)
+ANALYTICS_REFRESH_INTERVAL = int(os.getenv("ANALYTICS_REFRESH_INTERVAL", "300"))
@@ -1,8 +1,13 @@
 from core.database.config import Base
-from sqlalchemy import Column, DateTime, func, Boolean
+from sqlalchemy import Column, DateTime, func, Boolean, Index, text
 from sqlalchemy.orm import relationship, mapped_column, Mapped
 from sqlalchemy_serializer import SerializerMixin
 from sqlalchemy import Column, Integer, String, Text, BigInteger, Integer, ForeignKey
+from sqlalchemy import JSON
+
+
+# SQLite only autoincrements INTEGER primary keys (used by the load tests)
+Id = BigInteger().with_variant(Integer, "sqlite")
 
 
 class BaseModel(Base):
@@ -19,7 +24,7 @@ class BaseModel(Base):
 class User(BaseModel, SerializerMixin):
     __tablename__ = "users"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(Id, primary_key=True, autoincrement=True)
     first_name = Column(String(30), nullable=False)
     last_name = Column(String(30), nullable=False)
     email = Column(String(255), unique=True, nullable=False)
@@ -39,6 +44,17 @@ class User(BaseModel, SerializerMixin):
     # Relationship to Children
     children: Mapped[list["Child"]] = relationship(back_populates="parent")
 
+    __table_args__ = (
+        # Admin lookup when a child is added
+        Index(
+            "ix_users_active_superusers",
+            "id",
+            postgresql_where=text(
+                "is_superuser = true AND is_active = true AND is_deleted = false"
+            ),
+        ),
+    )
+
     def __repr__(self):
         return f"<User(id={self.id}, name={self.first_name} {self.last_name})>"
 
@@ -46,7 +62,7 @@ class User(BaseModel, SerializerMixin):
 class Child(BaseModel, SerializerMixin):
     __tablename__ = "children"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(Id, primary_key=True, autoincrement=True)
     name = Column(String(100), nullable=True)
     age = Column(Integer, nullable=True)
     additional_info = Column(Text, nullable=True)
@@ -55,5 +71,42 @@ class Child(BaseModel, SerializerMixin):
     parent_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=True)
     parent: Mapped["User"] = relationship(back_populates="children")
 
+    __table_args__ = (
+        # Children listing: parent filter, created_at range and keyset order
+        Index("ix_children_parent_id_created_at_id", "parent_id", "created_at", "id"),
+        Index("ix_children_parent_id_age", "parent_id", "age"),
+        # The name filter uses the GIN index of the unmapped search_vector
+        # column, see the add children search vector migration
+    )
+
     def __repr__(self):
         return f"<Child(id={self.id}, name={self.name})>"
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Id, primary_key=True, autoincrement=True)
+    name = Column(String(255), nullable=False)  # registered task name
+    args = Column(JSON, nullable=False, default=list)
+    status = Column(String(20), nullable=False, default="pending")
+    run_at = Column(DateTime, nullable=False)  # UTC
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    locked_until = Column(DateTime, nullable=True)  # UTC, lease of a running job
+    last_error = Column(Text, nullable=True)
+    # Coalesces jobs: only one row per key is ever inserted
+    dedupe_key = Column(String(255), nullable=True, unique=True)
+
+    created_at = Column(DateTime, default=func.now(), nullable=True)
+    updated_at = Column(
+        DateTime, default=func.now(), onupdate=func.now(), nullable=True
+    )
+
+    __table_args__ = (
+        # Claim query: due pending jobs and expired leases
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, name={self.name}, status={self.status})>"
@@ -1,29 +1,344 @@
-import sched
-import time
+import logging
 import threading
-from typing import Callable, Optional, Tuple
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert
+from core.database.config import SessionLocal
+from common.models import Job
+from common.constants import (
+    JOB_WORKERS,
+    JOB_POLL_INTERVAL,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF,
+)
 
-# Create a scheduler instance
-scheduler = sched.scheduler(time.time, time.sleep)
 
+logger = logging.getLogger(__name__)
 
-def start_scheduler():
+# Functions that may be executed from the jobs table, by task name
+tasks: Dict[str, Callable] = {}
+
+
+def job_task(func: Callable) -> Callable:
     """
-    Start the scheduler in a separate thread.
+    Register a function so it can be enqueued and executed as a durable job.
     """
-    # Ensure the scheduler runs in a separate thread
-    threading.Thread(target=scheduler.run).start()
+    tasks[task_name(func)] = func
+    return func
+
+
+def task_name(func: Callable) -> str:
+    return f"{func.__module__}.{func.__name__}"
 
 
-def schedule_job(delay_seconds: int, func: Callable, args: Optional[Tuple] = None):
+def enqueue_job(
+    db,
+    func: Callable,
+    args: Optional[Tuple] = None,
+    delay_seconds: int = 0,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> Job:
     """
-    Schedule a function to be executed after a certain delay.
+    Add a job to the session, to be executed after a certain delay.
 
+    The job is stored in the caller's transaction, so it only becomes visible
+    to the workers once the caller commits.
+
+    :param db: Database session (sync or async) the job is added to
+    :param func: A function registered with @job_task
+    :param args: Optional tuple of JSON serializable arguments
     :param delay_seconds: Delay in seconds before the function is executed
-    :param func: The function to be executed
-    :param args: Optional tuple of arguments to pass to the function
+    :param max_attempts: Executions before the job is marked as failed
+    """
+    name = task_name(func)
+    if name not in tasks:
+        raise ValueError(f"{name} is not registered with @job_task")
+
+    job = Job(
+        name=name,
+        args=list(args or ()),
+        status="pending",
+        run_at=datetime.utcnow() + timedelta(seconds=delay_seconds),
+        attempts=0,
+        max_attempts=max_attempts,
+    )
+    db.add(job)
+    return job
+
+
+def unique_job_insert(
+    func: Callable,
+    dedupe_key: str,
+    args: Optional[Tuple] = None,
+    delay_seconds: int = 0,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+):
+    """
+    Build an INSERT for a job that is skipped if `dedupe_key` already exists.
+
+    Execute it in the caller's transaction (``db.execute`` or
+    ``await db.execute``); concurrent requests across processes enqueue the
+    job only once.
+    """
+    name = task_name(func)
+    if name not in tasks:
+        raise ValueError(f"{name} is not registered with @job_task")
+
+    return (
+        insert(Job)
+        .values(
+            name=name,
+            args=list(args or ()),
+            status="pending",
+            run_at=datetime.utcnow() + timedelta(seconds=delay_seconds),
+            attempts=0,
+            max_attempts=max_attempts,
+            dedupe_key=dedupe_key,
+        )
+        .on_conflict_do_nothing(index_elements=[Job.dedupe_key])
+    )
+
+
+def delete_done_jobs(func: Callable, before: datetime):
+    """
+    Build a DELETE of the done jobs of a task that were due before `before`.
+
+    Recurring deduplicated jobs use it to prune the rows their keys leave.
+    """
+    return delete(Job).where(
+        Job.name == task_name(func), Job.status == "done", Job.run_at < before
+    )
+
+
+def claim_job() -> Optional[Job]:
+    """
+    Lock the next due job, mark it running and return it.
+
+    FOR UPDATE SKIP LOCKED lets every worker of every process poll the same
+    table without blocking each other or claiming the same row. A running job
+    whose lease expired (its worker died) is claimed again.
+    """
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        job = (
+            db.execute(
+                select(Job)
+                .where(
+                    Job.attempts < Job.max_attempts,
+                    or_(
+                        and_(Job.status == "pending", Job.run_at <= now),
+                        and_(Job.status == "running", Job.locked_until < now),
+                    ),
+                )
+                .order_by(Job.run_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            .scalars()
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = "running"
+        job.attempts += 1
+        job.locked_until = now + timedelta(seconds=JOB_LEASE_SECONDS)
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+        return job
+
+
+def fail_expired_jobs() -> int:
+    """
+    Mark running jobs whose lease expired on their last attempt as failed.
+
+    claim_job never reclaims them, so without this they would stay running.
+    """
+    with SessionLocal() as db:
+        result = db.execute(
+            update(Job)
+            .where(
+                Job.status == "running",
+                Job.locked_until < datetime.utcnow(),
+                Job.attempts >= Job.max_attempts,
+            )
+            .values(
+                status="failed",
+                locked_until=None,
+                last_error="Lease expired on the last attempt",
+            )
+        )
+        db.commit()
+    return result.rowcount
+
+
+def renew_lease(job: Job) -> bool:
+    """
+    Extend the lease of a running job, False if the worker no longer holds it.
+    """
+    locked_until = datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+    with SessionLocal() as db:
+        result = db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.locked_until == job.locked_until)
+            .values(locked_until=locked_until)
+        )
+        db.commit()
+    if not result.rowcount:
+        return False
+    job.locked_until = locked_until
+    return True
+
+
+def keep_lease(job: Job, done: threading.Event):
+    # Renew well before expiry so a slow database does not lose the lease
+    while not done.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            if not renew_lease(job):
+                logger.warning("Job %s (%s) lost its lease", job.id, job.name)
+                return
+        except Exception:
+            logger.exception("Failed to renew the lease of job %s", job.id)
+
+
+def run_job(job: Job):
+    """
+    Execute a claimed job and record its outcome.
+
+    The lease is renewed while the handler runs. The outcome is only written
+    if this worker still holds the lease; otherwise another worker reclaimed
+    the job and owns its status.
+    """
+    done = threading.Event()
+    keeper = threading.Thread(
+        target=keep_lease, args=(job, done), name=f"job-lease-{job.id}", daemon=True
+    )
+    keeper.start()
+
+    values = {"locked_until": None}
+    try:
+        tasks[job.name](*job.args)
+        values["status"] = "done"
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.id, job.name)
+        values["last_error"] = repr(e)
+        if job.attempts < job.max_attempts:
+            # Retry with exponential backoff
+            delay = JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            values["status"] = "pending"
+            values["run_at"] = datetime.utcnow() + timedelta(seconds=delay)
+        else:
+            values["status"] = "failed"
+    finally:
+        done.set()
+        keeper.join()
+
+    with SessionLocal() as db:
+        result = db.execute(
+            update(Job)
+            .where(
+                Job.id == job.id,
+                Job.status == "running",
+                Job.locked_until == job.locked_until,
+            )
+            .values(**values)
+        )
+        db.commit()
+    if not result.rowcount:
+        logger.warning(
+            "Job %s (%s) lost its lease, its outcome is discarded", job.id, job.name
+        )
+
+
+class JobWorkerPool:
+    """
+    A fixed number of threads polling the jobs table for due jobs.
     """
-    if args is None:
-        args = ()
-    scheduler.enter(delay_seconds, 1, func, args)
-    start_scheduler()
+
+    def __init__(self, size: int, poll_interval: float):
+        self.size = size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._stop.clear()
+        for index in range(self.size):
+            thread = threading.Thread(
+                target=self._work, name=f"job-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = claim_job()
+            except Exception:
+                logger.exception("Failed to claim a job")
+                job = None
+
+            if job is None:
+                # Nothing due: sweep jobs abandoned on their last attempt
+                try:
+                    fail_expired_jobs()
+                except Exception:
+                    logger.exception("Failed to sweep expired jobs")
+                self._stop.wait(self.poll_interval)
+                continue
+
+            run_job(job)
+
+
+class JobQueueCollector:
+    """
+    Report queued jobs per status, counted in the jobs table when /metrics is
+    scraped, so the figures are the same whichever process answers.
+    """
+
+    statuses = ("pending", "running", "failed")
+
+    def collect(self):
+        now = datetime.utcnow()
+        try:
+            with SessionLocal() as db:
+                rows = db.execute(
+                    select(
+                        Job.status,
+                        func.count(),
+                        func.count().filter(Job.run_at <= now),
+                    )
+                    .where(Job.status.in_(self.statuses))
+                    .group_by(Job.status)
+                ).all()
+        except SQLAlchemyError:
+            logger.exception("Failed to count queued jobs")
+            return
+
+        counts = {status: (total, due) for status, total, due in rows}
+        jobs = GaugeMetricFamily(
+            "job_queue_jobs", "Jobs in the durable queue, by status", labels=["status"]
+        )
+        for status in self.statuses:
+            jobs.add_metric([status], counts.get(status, (0, 0))[0])
+        yield jobs
+        yield GaugeMetricFamily(
+            "job_queue_due_jobs",
+            "Pending jobs whose run_at has passed",
+            value=counts.get("pending", (0, 0))[1],
+        )
+
+
+job_workers = JobWorkerPool(JOB_WORKERS, JOB_POLL_INTERVAL)
+job_queue_collector = JobQueueCollector()
@@ -1,14 +1,25 @@
+import hashlib
 import jwt
+import time
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
-from common.constants import SECRET_KEY
+from common.constants import (
+    SECRET_KEY,
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL,
+    TOKEN_CACHE_SIZE,
+)
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from typing import Annotated
-from sqlalchemy.orm import Session
-from core.database.dependencies import get_database
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database.dependencies import get_database, get_async_database
 from common.models import User
 from authentication.schemas import UserBase
+from common.cache import TTLCache
+from core.instrumentation.config import timed
+from common.utils.passwords import password_hasher
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
@@ -20,16 +31,105 @@ REFRESH_TOKEN_EXPIRE_DAYS = 30
 # oauth2_scheme = CustomOAuth2PasswordBearer(tokenUrl="token")
 
 
-# Configure the password context to use pbkdf2_sha256
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+class Principal:
+    """
+    The authenticated user as loaded and cached for authorization checks.
 
+    Only the columns authorization needs are selected, so the password and
+    profile columns are never read and no User entity enters the session.
+    Routes that change the user load the full entity with load().
+    """
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    __slots__ = ("id", "is_active", "is_deleted", "is_superuser")
+
+    def __init__(
+        self, id: int, is_active: bool, is_deleted: bool, is_superuser: bool = False
+    ):
+        self.id = id
+        self.is_active = is_active
+        self.is_deleted = is_deleted
+        self.is_superuser = is_superuser
+
+    def __repr__(self):
+        return (
+            f"Principal(id={self.id}, is_active={self.is_active}, "
+            f"is_deleted={self.is_deleted}, is_superuser={self.is_superuser})"
+        )
+
+    def load(self, db: Session) -> User:
+        return db.get(User, self.id)
+
+    async def load_async(self, db: AsyncSession) -> User:
+        return await db.get(User, self.id)
+
+
+def principal_query(user_id: int):
+    return select(
+        User.id, User.is_active, User.is_deleted, User.is_superuser
+    ).filter_by(id=user_id)
+
+
+# Principals by user id, so authenticated requests skip the users lookup
+principal_cache = TTLCache(
+    maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL, name="principal"
+)
+
+
+# Payloads of verified access tokens by token digest, each kept until its exp
+token_cache = TTLCache(
+    maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60, name="token"
+)
+
+
+def cache_principal(row) -> Principal:
+    principal = Principal(row.id, row.is_active, row.is_deleted, row.is_superuser)
+    principal_cache.set(row.id, principal)
+    return principal
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.invalidate(int(user_id))
+
+
+@event.listens_for(User, "after_update")
+def track_principal_change(mapper, connection, target):
+    """
+    Remember users whose activation, soft-delete or superuser state changed in
+    a flush.
+    """
+    state = inspect(target)
+    if (
+        state.attrs.is_active.history.has_changes()
+        or state.attrs.is_deleted.history.has_changes()
+        or state.attrs.is_superuser.history.has_changes()
+    ):
+        session = object_session(target)
+        session.info.setdefault("changed_principals", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_principals(session):
+    for user_id in session.info.pop("changed_principals", ()):
+        invalidate_principal(user_id)
+
+
+# Hashing runs in the password hasher's process pool, see common.utils.passwords
+def verify_and_update_password(plain_password, hashed_password):
+    return password_hasher.verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
+
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    return await password_hasher.verify_and_update_async(
+        plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password):
+    return await password_hasher.hash_async(password)
 
 
 def create_activation_token(data: dict, expires_delta: timedelta = None):
@@ -79,6 +179,25 @@ def verify_token(token: str, token_type: str):
         raise Exception("Invalid token")
 
 
+def verify_access_token(token: str) -> dict:
+    """
+    Verify an access token, skipping the signature check for tokens already
+    verified by this process.
+
+    Tokens are cached by their SHA-256 digest, so a token whose signature
+    was not verified can never produce a hit, and expire from the cache at
+    their own exp.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    if (payload := token_cache.get(key)) is not None:
+        return payload
+
+    payload = verify_token(token, token_type="access")
+    if (ttl := payload.get("exp", 0) - time.time()) > 0:
+        token_cache.set(key, payload, ttl=ttl)
+    return payload
+
+
 def extract_token(request: Request) -> str:
     authorization: str = request.headers.get("Authorization")
     if authorization and authorization.startswith("Bearer "):
@@ -90,6 +209,7 @@ def extract_token(request: Request) -> str:
     )
 
 
+@timed("auth")
 def get_current_user(
     token: Annotated[str, Depends(extract_token)], db: Session = Depends(get_database)
 ):
@@ -99,7 +219,7 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = verify_token(token, token_type="access")
+        payload = verify_access_token(token)
         token_type: str = payload.get("token_type")
 
         if token_type != "access":
@@ -108,10 +228,13 @@ def get_current_user(
         if not (user_id := payload.get("sub")):
             raise credentials_exception
 
-        if not (user := db.query(User).filter_by(id=int(user_id)).first()):
+        if principal := principal_cache.get(int(user_id)):
+            return principal
+
+        if not (row := db.execute(principal_query(int(user_id))).first()):
             raise credentials_exception
 
-        return user
+        return cache_principal(row)
 
     except Exception as e:
         raise credentials_exception from e
@@ -127,3 +250,60 @@ def get_current_active_user(
         )
 
     return current_user
+
+
+@timed("auth")
+async def get_current_user_async(
+    token: Annotated[str, Depends(extract_token)],
+    db: AsyncSession = Depends(get_async_database),
+):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = verify_access_token(token)
+        token_type: str = payload.get("token_type")
+
+        if token_type != "access":
+            raise credentials_exception
+
+        if not (user_id := payload.get("sub")):
+            raise credentials_exception
+
+        if principal := principal_cache.get(int(user_id)):
+            return principal
+
+        result = await db.execute(principal_query(int(user_id)))
+        if not (row := result.first()):
+            raise credentials_exception
+
+        return cache_principal(row)
+
+    except Exception as e:
+        raise credentials_exception from e
+
+
+async def get_current_active_user_async(
+    current_user: Annotated[UserBase, Depends(get_current_user_async)]
+):
+    return get_current_active_user(current_user)
+
+
+def get_current_superuser(
+    current_user: Annotated[UserBase, Depends(get_current_active_user)]
+):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can perform this action",
+        )
+
+    return current_user
+
+
+async def get_current_superuser_async(
+    current_user: Annotated[UserBase, Depends(get_current_active_user_async)]
+):
+    return get_current_superuser(current_user)
@@ -0,0 +1,49 @@
+import calendar
+import hashlib
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response, status
+
+
+def conditional_headers(parts: tuple, last_modified: Optional[datetime]) -> dict:
+    """
+    Build the validators of a response from the values it is derived from.
+
+    `parts` must identify the representation: the resource, the query
+    parameters and the version columns (updated_at, row count) it was built
+    from. The ETag is weak, since the same data may be encoded differently.
+    """
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    headers = {"ETag": f'W/"{digest}"', "Cache-Control": "private, no-cache"}
+
+    if last_modified is not None:
+        # updated_at is stored as naive UTC
+        headers["Last-Modified"] = formatdate(
+            calendar.timegm(last_modified.utctimetuple()), usegmt=True
+        )
+    return headers
+
+
+def is_not_modified(request: Request, headers: dict) -> bool:
+    """
+    Evaluate If-None-Match, or else If-Modified-Since, against the validators.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = headers["ETag"].removeprefix("W/")
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or "Last-Modified" not in headers:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return parsedate_to_datetime(headers["Last-Modified"]) <= since
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
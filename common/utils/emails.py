@@ -1,24 +1,139 @@
 # sending test email
-from core.email.config import send_html_email, render_html_content
+import html
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from core.email.config import (
+    send_html_email,
+    deliver_html_emails,
+    render_html_content,
+    email_templates,
+)
+from core.database.config import SessionLocal
+from common.constants import CHILD_ADDED_DIGEST_WINDOW, CHILD_ADDED_DIGEST_MAX_ITEMS
+from common.models import Child, User
+from common.scheduler import job_task, unique_job_insert
+
+
+# Time given to transactions still committing when a digest window closes
+CHILD_ADDED_DIGEST_GRACE = 30
+
+EPOCH = datetime(1970, 1, 1)
 
 
 def send_activation_email(user, token):
     subject = "Activate your account"
 
     message_html = render_html_content(
-        "core/email/templates/activate.html",
+        "activate.html",
         {"first_name": user.first_name, "token": token},
     )
     send_html_email(subject=subject, body=message_html, recipient=user.email)
 
 
+@job_task
 def send_admin_email(child_name, parent_name, admin_emails: list):
     subject = "Child added"
 
     message_html = render_html_content(
-        "core/email/templates/child_added.html",
+        "child_added.html",
         {"name": child_name, "parent_name": parent_name},
     )
 
-    for admin_email in admin_emails:
-        send_html_email(subject=subject, body=message_html, recipient=admin_email)
+    # One pooled SMTP session for all admins, failures retry the job
+    deliver_html_emails(subject=subject, body=message_html, recipients=admin_emails)
+
+
+@job_task
+def send_admin_bulk_email(child_names: list, parent_name, admin_emails: list):
+    subject = f"{len(child_names)} children added"
+
+    message_html = render_html_content(
+        "child_added_digest.html",
+        {
+            "count": len(child_names),
+            "items": child_added_items([(name, parent_name) for name in child_names]),
+        },
+    )
+    deliver_html_emails(subject=subject, body=message_html, recipients=admin_emails)
+
+
+def child_added_items(children) -> str:
+    """
+    Render (child name, parent name) pairs as the digest template's list items.
+    """
+    return "\n".join(
+        f"        <li>{html.escape(parent_name)} added {html.escape(name or '')}</li>"
+        for name, parent_name in children
+    )
+
+
+def child_added_digest_job(created_at: datetime):
+    """
+    Build the job insert for the digest covering a child created at `created_at`.
+
+    Windows are aligned to CHILD_ADDED_DIGEST_WINDOW seconds, and the job is
+    keyed by its window so every child added in it shares a single digest.
+    The children table itself is the event log the digest is built from.
+    """
+    offset = (created_at - EPOCH).total_seconds() % CHILD_ADDED_DIGEST_WINDOW
+    window_start = created_at - timedelta(seconds=offset)
+    window_end = window_start + timedelta(seconds=CHILD_ADDED_DIGEST_WINDOW)
+
+    return unique_job_insert(
+        send_child_added_digest,
+        dedupe_key=f"child_added_digest:{window_start.isoformat()}",
+        args=(window_start.isoformat(), window_end.isoformat()),
+        delay_seconds=(window_end - created_at).total_seconds()
+        + CHILD_ADDED_DIGEST_GRACE,
+    )
+
+
+@job_task
+def send_child_added_digest(window_start: str, window_end: str):
+    """
+    Send each admin one email listing the children added in the window.
+
+    Windows with more than CHILD_ADDED_DIGEST_MAX_ITEMS children are split
+    into several digests.
+    """
+    with SessionLocal() as db:
+        admin_emails = (
+            db.execute(
+                select(User.email).filter_by(
+                    is_superuser=True, is_active=True, is_deleted=False
+                )
+            )
+            .scalars()
+            .all()
+        )
+        children = db.execute(
+            select(Child.name, User.first_name)
+            .join(Child.parent)
+            .where(
+                Child.created_at >= datetime.fromisoformat(window_start),
+                Child.created_at < datetime.fromisoformat(window_end),
+            )
+            .order_by(Child.created_at, Child.id)
+        ).all()
+
+    if not admin_emails or not children:
+        return
+
+    digests = [
+        children[start : start + CHILD_ADDED_DIGEST_MAX_ITEMS]
+        for start in range(0, len(children), CHILD_ADDED_DIGEST_MAX_ITEMS)
+    ]
+    messages_html = email_templates.render_many(
+        "child_added_digest.html",
+        [
+            {"count": len(items), "items": child_added_items(items)}
+            for items in digests
+        ],
+    )
+
+    for items, message_html in zip(digests, messages_html):
+        deliver_html_emails(
+            subject=f"{len(items)} children added",
+            body=message_html,
+            recipients=admin_emails,
+        )
@@ -0,0 +1,32 @@
+import base64
+import binascii
+import json
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values) -> str:
+    """
+    Encode the keyset values of the last row of a page into an opaque cursor.
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Decode a cursor produced by encode_cursor back into its keyset values.
+
+    Raises:
+    - HTTPException: If the cursor is malformed or does not hold `size` values.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return values
@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from common.constants import (
+    PASSWORD_HASH_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_QUEUE_LIMIT,
+)
+from core.instrumentation.config import timed
+
+
+# Configure the password context to use pbkdf2_sha256. Hashes made with any
+# other round count are reported by needs_update and replaced on login.
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=PASSWORD_HASH_ROUNDS,
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_and_update_password(
+    password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password, returning a new hash when the stored one is outdated.
+    """
+    verified = pwd_context.verify(password, hashed_password)
+    if verified and pwd_context.needs_update(hashed_password):
+        return verified, pwd_context.hash(password)
+    return verified, None
+
+
+class PasswordHasher:
+    """
+    Hash and verify passwords in a dedicated pool of worker processes.
+
+    Hashing is CPU bound by design, so it is kept off request threads and the
+    event loop, and limited to `workers` cores. At most `queue_limit` calls
+    may be pending; beyond that requests fail fast with a 503 instead of
+    queueing behind a login burst.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _submit(self, func, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy. Please try again shortly.",
+            )
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    @timed("password")
+    def hash(self, password: str) -> str:
+        return self._submit(hash_password, password).result()
+
+    @timed("password")
+    def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        return self._submit(
+            verify_and_update_password, password, hashed_password
+        ).result()
+
+    @timed("password")
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(hash_password, password))
+
+    @timed("password")
+    async def verify_and_update_async(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await asyncio.wrap_future(
+            self._submit(verify_and_update_password, password, hashed_password)
+        )
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
@@ -0,0 +1,299 @@
+import hashlib
+import os
+import uuid
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, Request, status
+from multipart.multipart import MultipartParser, parse_options_header
+
+
+# Largest text field, and all text fields together, accepted in a form (bytes)
+FORM_FIELD_MAX_SIZE = 64 * 1024
+FORM_FIELDS_MAX_SIZE = 256 * 1024
+
+# Most parts (text fields and files) accepted in a form
+FORM_MAX_PARTS = 32
+
+# Leading bytes of the accepted image formats, and their saved extension
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+# Bytes needed to tell the accepted formats apart
+IMAGE_SNIFF_SIZE = 12
+
+
+class StreamedFile(NamedTuple):
+    """
+    An upload written to a temporary path, to be moved by the caller.
+    """
+
+    path: str
+    extension: str
+    sha256: str
+    size: int
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Return the file extension matching the image's magic bytes, if accepted.
+    """
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+class StreamingFormParser:
+    """
+    Parse a multipart/form-data request body as it is received.
+
+    Text fields are kept in memory, and the image sent as `file_field` is
+    written to `directory` chunk by chunk with async file I/O, so no worker
+    thread is held while a slow client uploads. The image type is sniffed
+    from its first bytes, its size is capped at `max_size` and its SHA-256 is
+    computed while it is written. A rejected or interrupted upload leaves no
+    file behind. The number of parts and the size of the text fields are
+    capped too, and text that is not UTF-8 is rejected.
+    """
+
+    def __init__(
+        self, request: Request, file_field: str, directory: str, max_size: int
+    ):
+        self.request = request
+        self.file_field = file_field
+        self.directory = directory
+        self.max_size = max_size
+        self.fields: Dict[str, str] = {}
+        self.file: Optional[StreamedFile] = None
+
+        self._events = []
+        self._headers = []
+        self._header_field = b""
+        self._header_value = b""
+
+        self._name = None
+        self._value = bytearray()
+        self._parts = 0
+        self._fields_size = 0
+        self._is_file = False
+        self._is_upload = False
+
+        self._file = None
+        self._part_path = None
+        self._head = b""
+        self._size = 0
+        self._extension = None
+        self._sha256 = hashlib.sha256()
+
+    # MultipartParser callbacks only record events, which are handled
+    # asynchronously after each chunk
+    def on_part_begin(self):
+        self._events.append(("begin", None))
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        self._events.append(("data", data[start:end]))
+
+    def on_part_end(self):
+        self._events.append(("end", None))
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers.append((self._header_field.lower(), self._header_value))
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        self._events.append(("headers", dict(self._headers)))
+        self._headers = []
+
+    async def parse(self) -> Tuple[Dict[str, str], Optional[StreamedFile]]:
+        """
+        Consume the request body.
+
+        Returns the text fields and the streamed image, if one was sent. The
+        caller owns the image's temporary file from then on.
+        """
+        content_type, params = parse_options_header(
+            self.request.headers.get("content-type", "")
+        )
+        content_length = self.request.headers.get("content-length", "")
+
+        if content_type == b"application/x-www-form-urlencoded":
+            # Text fields only, parsed in one go once their length is checked
+            if not content_length.isdigit():
+                raise HTTPException(
+                    status_code=status.HTTP_411_LENGTH_REQUIRED,
+                    detail="Content-Length is required for url-encoded forms",
+                )
+            if int(content_length) > FORM_FIELDS_MAX_SIZE:
+                self._fields_too_large()
+            form = await self.request.form(max_fields=FORM_MAX_PARTS)
+            return {name: value for name, value in form.items()}, None
+
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Expected a multipart/form-data body",
+            )
+
+        # Refuse oversized bodies before reading them when the length is known
+        if content_length.isdigit() and int(content_length) > (
+            self.max_size + FORM_FIELDS_MAX_SIZE
+        ):
+            self._too_large()
+
+        parser = MultipartParser(
+            params[b"boundary"],
+            {
+                "on_part_begin": self.on_part_begin,
+                "on_part_data": self.on_part_data,
+                "on_part_end": self.on_part_end,
+                "on_header_field": self.on_header_field,
+                "on_header_value": self.on_header_value,
+                "on_header_end": self.on_header_end,
+                "on_headers_finished": self.on_headers_finished,
+            },
+        )
+
+        try:
+            async for chunk in self.request.stream():
+                parser.write(chunk)
+                await self._handle_events()
+            parser.finalize()
+            await self._handle_events()
+        except BaseException:
+            await self._discard()
+            raise
+
+        return self.fields, self.file
+
+    async def _handle_events(self):
+        for event, data in self._events:
+            if event == "begin":
+                self._name = None
+                self._value = bytearray()
+            elif event == "headers":
+                self._parts += 1
+                if self._parts > FORM_MAX_PARTS:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Forms can have at most {FORM_MAX_PARTS} fields",
+                    )
+                _, options = parse_options_header(
+                    data.get(b"content-disposition", b"")
+                )
+                self._name = self._decode(options.get(b"name", b""))
+                self._is_file = b"filename" in options
+                # Further files, or a second copy of the image, are ignored
+                self._is_upload = (
+                    self._is_file
+                    and self._name == self.file_field
+                    and self._extension is None
+                )
+            elif event == "data":
+                if self._is_upload:
+                    await self._write(data)
+                elif not self._is_file:
+                    self._value += data
+                    self._fields_size += len(data)
+                    if len(self._value) > FORM_FIELD_MAX_SIZE:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Field {self._name} is too large",
+                        )
+                    if self._fields_size > FORM_FIELDS_MAX_SIZE:
+                        self._fields_too_large()
+            elif event == "end":
+                if self._is_upload:
+                    await self._close_upload()
+                elif not self._is_file:
+                    self.fields[self._name] = self._decode(self._value)
+        self._events.clear()
+
+    def _decode(self, value: bytes) -> str:
+        try:
+            return value.decode()
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Form fields must be UTF-8 encoded",
+            )
+
+    async def _write(self, data: bytes):
+        self._size += len(data)
+        if self._size > self.max_size:
+            self._too_large()
+
+        if self._file is None:
+            # Hold the first bytes back until the image type is known
+            self._head += data
+            if len(self._head) < IMAGE_SNIFF_SIZE:
+                return
+            await self._open_upload()
+            data, self._head = self._head, b""
+
+        self._sha256.update(data)
+        await self._file.write(data)
+
+    async def _open_upload(self):
+        self._extension = sniff_image_type(self._head)
+        if self._extension is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Profile photo must be a JPEG, PNG, GIF or WebP image",
+            )
+
+        await anyio.Path(self.directory).mkdir(parents=True, exist_ok=True)
+        self._part_path = os.path.join(self.directory, f".{uuid.uuid4()}.part")
+        self._file = await anyio.open_file(self._part_path, "wb")
+
+    async def _close_upload(self):
+        if self._file is None:
+            if not self._head:
+                # The field was sent without a file selected
+                return
+            await self._open_upload()
+            self._sha256.update(self._head)
+            await self._file.write(self._head)
+            self._head = b""
+
+        await self._file.aclose()
+        self._file = None
+        self.file = StreamedFile(
+            self._part_path, self._extension, self._sha256.hexdigest(), self._size
+        )
+
+    async def _discard(self):
+        # Also runs when the request is cancelled (client disconnected)
+        with anyio.CancelScope(shield=True):
+            if self._file is not None:
+                await self._file.aclose()
+                self._file = None
+            if self._part_path is not None:
+                await anyio.Path(self._part_path).unlink(missing_ok=True)
+        self._part_path = None
+        self.file = None
+
+    def _fields_too_large(self):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Form fields must be at most {FORM_FIELDS_MAX_SIZE} bytes in total",
+        )
+
+    def _too_large(self):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Profile photo must be at most {self.max_size} bytes",
+        )
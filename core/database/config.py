@@ -1,10 +1,306 @@
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from typing import Optional
+import itertools
+import logging
+import math
+import threading
+import time
+from sqlalchemy import Select, create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from common.constants import DATABASE_URL
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from starlette.datastructures import MutableHeaders
+from common.cache import TTLCache
+from common.constants import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DATABASE_ASYNC_MODE,
+    DATABASE_REPLICA_URLS,
+    ASYNC_DATABASE_REPLICA_URLS,
+    DATABASE_REPLICA_MAX_LAG,
+    DATABASE_REPLICA_CHECK_INTERVAL,
+    DATABASE_REPLICA_STICKY_SECONDS,
+)
+from core.instrumentation.config import instrument_engine
+from core.metrics.config import (
+    DB_REPLICA_LAG,
+    TimedAsyncAdaptedQueuePool,
+    TimedQueuePool,
+    instrument_pool,
+)
+from core.query_budget.config import record_queries
 
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+logger = logging.getLogger(__name__)
+
+# Seconds a replica is behind the primary, 0 when it has replayed everything
+# it received (an idle primary does not make it look late), NULL when its WAL
+# receiver is not streaming, since it then stops receiving anything. Reading
+# pg_stat_wal_receiver.status needs the pg_monitor role.
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+# Time of the client's last write, so it keeps reading from the primary
+# whichever worker serves its next requests
+LAST_WRITE_COOKIE = "last_write"
+
+
+class WriteMarker:
+    """
+    Whether the current request wrote to the primary.
+    """
+
+    __slots__ = ("wrote",)
+
+    def __init__(self):
+        self.wrote = False
+
+
+# Write marker of the current request, None outside of a request
+current_writes: ContextVar[Optional[WriteMarker]] = ContextVar(
+    "current_writes", default=None
+)
+
+
+def create_instrumented_engine(url: str, pool_label: str):
+    engine = create_engine(url, pool_pre_ping=True, poolclass=TimedQueuePool)
+    instrument_engine(engine)
+    instrument_pool(engine, pool_label)
+    record_queries(engine)
+    return engine
+
+
+def create_instrumented_async_engine(url: str, pool_label: str):
+    engine = create_async_engine(
+        url, pool_pre_ping=True, poolclass=TimedAsyncAdaptedQueuePool
+    )
+    instrument_engine(engine.sync_engine)
+    instrument_pool(engine.sync_engine, pool_label)
+    record_queries(engine.sync_engine)
+    return engine
+
+
+class RoutingSession(Session):
+    """
+    A session reading from the replica in info["replica"], if any.
+
+    Plain SELECTs go to the replica; flushes, DML and locking reads go to the
+    primary, and once the session has written every later statement does too,
+    so a request always reads its own writes. info["wrote"] records whether
+    the session wrote.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+            self.info["replica"] = None
+            if (marker := current_writes.get()) is not None:
+                marker.wrote = True
+        elif (
+            (replica := self.info.get("replica")) is not None
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+class ReplicaSet:
+    """
+    Read replicas used in turn, skipping those lagging too far behind.
+
+    A thread checks the lag of every replica each `check_interval` seconds;
+    until a replica's first check succeeds, and whenever its lag is over
+    `max_lag`, it cannot be reached or its WAL receiver is not streaming,
+    reads fall back to the primary. Clients who wrote in the last
+    `sticky_seconds` keep reading from the primary: the last write time is
+    kept in a cookie, so it holds across worker processes, and per user in
+    each process for clients that do not keep cookies. It should outlast
+    `max_lag`.
+    """
+
+    def __init__(
+        self,
+        urls: list,
+        async_urls: list,
+        max_lag: float,
+        check_interval: float,
+        sticky_seconds: float,
+        sticky_size: int = 10000,
+    ):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self.engines = [
+            create_instrumented_engine(url, f"replica-{index}")
+            for index, url in enumerate(urls)
+        ]
+        self.async_engines = []
+        if DATABASE_ASYNC_MODE:
+            self.async_engines = [
+                create_instrumented_async_engine(url, f"replica-{index}-async")
+                for index, url in enumerate(async_urls)
+            ]
+        self.healthy = [False] * len(self.engines)
+        self.sticky = TTLCache(sticky_size, sticky_seconds)
+        self._turn = itertools.count()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def choose(
+        self, user_id=None, async_mode: bool = False, last_write: str = None
+    ):
+        """
+        Return the (sync) engine to read from, or None to use the primary.
+
+        `last_write` is the client's last write cookie, if any.
+        """
+        if user_id is not None and self.sticky.get(user_id):
+            return None
+        if self.wrote_recently(last_write):
+            return None
+        healthy = [index for index, ok in enumerate(self.healthy) if ok]
+        if not healthy:
+            return None
+        index = healthy[next(self._turn) % len(healthy)]
+        if async_mode:
+            return self.async_engines[index].sync_engine
+        return self.engines[index]
+
+    def mark_written(self, user_id):
+        self.sticky.set(user_id, True)
+
+    def wrote_recently(self, last_write: Optional[str]) -> bool:
+        try:
+            elapsed = time.time() - float(last_write)
+        except (TypeError, ValueError):
+            return False
+        return 0 <= elapsed < self.sticky_seconds
+
+    def last_write_cookie(self) -> str:
+        return (
+            f"{LAST_WRITE_COOKIE}={time.time():.3f}; "
+            f"Max-Age={math.ceil(self.sticky_seconds)}; Path=/; HttpOnly; "
+            "SameSite=Lax"
+        )
+
+    def check_lag(self):
+        for index, engine in enumerate(self.engines):
+            try:
+                with engine.connect() as conn:
+                    lag = conn.scalar(REPLICA_LAG_QUERY)
+            except Exception:
+                logger.warning("Replica %s is unreachable", index, exc_info=True)
+                self.healthy[index] = False
+                continue
+
+            if lag is None:
+                if self.healthy[index]:
+                    logger.warning("Replica %s skipped (not streaming)", index)
+                self.healthy[index] = False
+                continue
+
+            lag = float(lag)
+
+            DB_REPLICA_LAG.labels(str(index)).set(lag)
+            healthy = lag <= self.max_lag
+            if healthy != self.healthy[index]:
+                logger.warning(
+                    "Replica %s %s (lag %.1fs)",
+                    index,
+                    "back in use" if healthy else "skipped",
+                    lag,
+                )
+            self.healthy[index] = healthy
+
+    def start(self):
+        if not self.engines:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._monitor, name="replica-lag", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _monitor(self):
+        while not self._stop.is_set():
+            self.check_lag()
+            self._stop.wait(self.check_interval)
+
+
+engine = create_instrumented_engine(DATABASE_URL, "sync")
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine
+)
+
+# Async engine is only created in async mode so asyncpg stays an optional driver
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_ASYNC_MODE:
+    async_engine = create_instrumented_async_engine(ASYNC_DATABASE_URL, "async")
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        sync_session_class=RoutingSession,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+replicas = ReplicaSet(
+    DATABASE_REPLICA_URLS,
+    ASYNC_DATABASE_REPLICA_URLS,
+    max_lag=DATABASE_REPLICA_MAX_LAG,
+    check_interval=DATABASE_REPLICA_CHECK_INTERVAL,
+    sticky_seconds=DATABASE_REPLICA_STICKY_SECONDS,
+)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Set the last write cookie on responses to requests that wrote to the
+    primary, when read replicas are configured.
+
+    The cookie is added when the response starts, so writes made while a
+    response is streamed do not set it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas.engines:
+            return await self.app(scope, receive, send)
+
+        marker = WriteMarker()
+        token = current_writes.set(marker)
+
+        async def send_marked(message):
+            if message["type"] == "http.response.start" and marker.wrote:
+                headers = MutableHeaders(scope=message)
+                headers.append("set-cookie", replicas.last_write_cookie())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_marked)
+        finally:
+            current_writes.reset(token)
+
 
 Base = declarative_base()
@@ -1,10 +1,61 @@
-from typing import Generator
-from core.database.config import SessionLocal
+from typing import AsyncGenerator, Generator, Optional
+from fastapi import Request
+from core.database.config import (
+    LAST_WRITE_COOKIE,
+    SessionLocal,
+    AsyncSessionLocal,
+    replicas,
+)
 
 
-def get_database() -> Generator:
+# Requests served from a read replica when one is configured
+READ_METHODS = ("GET", "HEAD")
+
+
+def request_user_id(request: Request) -> Optional[int]:
+    """
+    Return the user id of a valid bearer token, used to pin writers to the
+    primary. Verified tokens are cached, so the auth dependency pays nothing
+    more for it.
+    """
+    from common.utils.auth import extract_token, verify_access_token
+
+    try:
+        return int(verify_access_token(extract_token(request))["sub"])
+    except Exception:
+        return None
+
+
+def get_database(request: Request) -> Generator:
     db = SessionLocal()
+    user_id = None
+    if replicas.engines:
+        user_id = request_user_id(request)
+        if request.method in READ_METHODS:
+            db.info["replica"] = replicas.choose(
+                user_id, last_write=request.cookies.get(LAST_WRITE_COOKIE)
+            )
     try:
         yield db
     finally:
         db.close()
+        if user_id is not None and db.info.get("wrote"):
+            replicas.mark_written(user_id)
+
+
+async def get_async_database(request: Request) -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        user_id = None
+        if replicas.engines:
+            user_id = request_user_id(request)
+            if request.method in READ_METHODS:
+                db.info["replica"] = replicas.choose(
+                    user_id,
+                    async_mode=True,
+                    last_write=request.cookies.get(LAST_WRITE_COOKIE),
+                )
+        try:
+            yield db
+        finally:
+            if user_id is not None and db.info.get("wrote"):
+                replicas.mark_written(user_id)
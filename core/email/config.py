@@ -1,18 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
 from email.message import EmailMessage as BaseEmailMessage
 from fastapi import HTTPException
 from string import Template
+import logging
+import os
+import queue
 import smtplib
 import threading
+import time
 from common.constants import (
     EMAIL_HOST,
     EMAIL_HOST_PASSWORD,
     EMAIL_HOST_USER,
     EMAIL_PORT,
+    EMAIL_USE_TLS,
+    EMAIL_POOL_SIZE,
+    EMAIL_BATCH_SIZE,
+    DEBUG,
 )
+from core.metrics.config import EMAIL_MESSAGES, EMAIL_SEND_DURATION
 
 
 EMAIL_HOST_SENDER = "info@parentchildmanagement.com"
 
+EMAIL_TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+logger = logging.getLogger(__name__)
+
 
 class EmailMessage:
     def __init__(self, subject: str, body: str, sender: str, recipient: str):
@@ -32,44 +46,257 @@ class EmailMessage:
     def send(self):
         msg = self.create_message()
         try:
-            with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-                server.starttls()
-                server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-                server.send_message(msg)
+            smtp_pool.send_messages([msg])
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
 
-class EmailThread(threading.Thread):
-    def __init__(self, subject, body, recipient):
-        self.subject = subject
-        self.recipient = recipient
-        self.body = body
-        threading.Thread.__init__(self)
-
-    def run(self):
-        email = EmailMessage(self.subject, self.body, EMAIL_HOST_SENDER, self.recipient)
-        email.content_subtype = "html"
-        max_tries = 3
-        tries = 0
-        while tries < max_tries:
+class SMTPConnectionPool:
+    """
+    A small pool of authenticated SMTP connections kept alive between messages.
+
+    A connection is opened (STARTTLS and login included) only when no idle one
+    is available, and several messages are sent over it in one session before
+    it goes back to the pool. Failed sessions are dropped and the remaining
+    messages are retried on a fresh connection with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str = None,
+        password: str = None,
+        use_tls: bool = True,
+        size: int = 3,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        idle_check_after: float = 30.0,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle_check_after = idle_check_after
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.user:
+            server.login(self.user, self.password)
+        return server
+
+    def _take(self) -> smtplib.SMTP:
+        """
+        Return an idle connection that is still alive, or open a new one.
+        """
+        while True:
+            try:
+                server, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if time.monotonic() - released_at < self.idle_check_after:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(server)
+
+    def _discard(self, server: smtplib.SMTP):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def send_messages(self, messages: list):
+        """
+        Send the messages in one SMTP session, reconnecting on failure.
+
+        Recipients refused by the server are logged and skipped, since retrying
+        them on another connection cannot succeed.
+        """
+        pending = list(messages)
+        attempt = 0
+
+        while pending:
+            with self._slots:
+                server = None
+                try:
+                    server = self._take()
+                    while pending:
+                        started = time.perf_counter()
+                        try:
+                            server.send_message(pending[0])
+                            EMAIL_MESSAGES.labels("sent").inc()
+                        except smtplib.SMTPRecipientsRefused as e:
+                            logger.warning("Recipients refused: %s", e.recipients)
+                            EMAIL_MESSAGES.labels("refused").inc()
+                        EMAIL_SEND_DURATION.observe(time.perf_counter() - started)
+                        pending.pop(0)
+                    self._idle.put((server, time.monotonic()))
+                    return
+                except (smtplib.SMTPException, OSError) as e:
+                    if server is not None:
+                        self._discard(server)
+                    attempt += 1
+                    if attempt >= self.max_retries:
+                        EMAIL_MESSAGES.labels("failed").inc(len(pending))
+                        raise
+                    logger.warning(
+                        "SMTP delivery failed (attempt %s), reconnecting: %s",
+                        attempt,
+                        e,
+                    )
+
+            time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def close(self):
+        while True:
             try:
-                email.send()
-                break  # exit the loop if email successfully sent
-            except:
-                tries += 1
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server)
+
+
+class EmailDeliveryEngine:
+    """
+    Deliver messages in the background over a pooled set of SMTP connections.
+
+    Submitted messages are split into batches, and each batch is sent in a
+    single SMTP session by one of the worker threads.
+    """
+
+    def __init__(self, pool: SMTPConnectionPool, batch_size: int = 20):
+        self.pool = pool
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool.size, thread_name_prefix="email"
+        )
+
+    def _deliver(self, messages: list):
+        try:
+            self.pool.send_messages(messages)
+        except Exception:
+            logger.exception("Failed to deliver %s email(s)", len(messages))
+
+    def submit(self, messages: list):
+        messages = [message.create_message() for message in messages]
+        for start in range(0, len(messages), self.batch_size):
+            batch = messages[start : start + self.batch_size]
+            self._executor.submit(self._deliver, batch)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+
+
+smtp_pool = SMTPConnectionPool(
+    EMAIL_HOST,
+    EMAIL_PORT,
+    user=EMAIL_HOST_USER,
+    password=EMAIL_HOST_PASSWORD,
+    use_tls=EMAIL_USE_TLS,
+    size=EMAIL_POOL_SIZE,
+)
+delivery_engine = EmailDeliveryEngine(smtp_pool, batch_size=EMAIL_BATCH_SIZE)
 
 
 def send_html_email(subject, body, recipient):
-    email = EmailThread(subject, body, recipient)
-    email.start()
+    send_html_emails(subject, body, [recipient])
 
 
-# input variables to html file
-def render_html_content(html_file, variables):
-    # Read the HTML file
-    with open(html_file, "r") as file:
-        html_content = Template(file.read())
+def send_html_emails(subject, body, recipients: list):
+    delivery_engine.submit(html_messages(subject, body, recipients))
+
+
+def deliver_html_emails(subject, body, recipients: list):
+    """
+    Send the emails now over the pooled SMTP connections.
+
+    Unlike send_html_emails, SMTP failures are raised to the caller, so a
+    durable job sending them is retried instead of marked done.
+    """
+    messages = html_messages(subject, body, recipients)
+    smtp_pool.send_messages([message.create_message() for message in messages])
+
+
+def html_messages(subject, body, recipients: list) -> list:
+    return [
+        EmailMessage(subject, body, EMAIL_HOST_SENDER, recipient)
+        for recipient in recipients
+    ]
+
 
-    # Substitute the variables in the HTML content
-    return html_content.substitute(**variables)
+class TemplateRegistry:
+    """
+    Email templates compiled once and rendered from memory.
+
+    Every file in the directory is read and compiled by load(), normally at
+    startup. With reload enabled (debug mode) a template is recompiled when its
+    file's mtime changes.
+    """
+
+    def __init__(self, directory: str, reload: bool = False):
+        self.directory = directory
+        self.reload = reload
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def _compile(self, name: str):
+        path = os.path.join(self.directory, name)
+        mtime = os.stat(path).st_mtime
+        with open(path, "r") as file:
+            template = Template(file.read())
+        self._templates[name] = (mtime, template)
+        return template
+
+    def load(self):
+        with self._lock:
+            for name in sorted(os.listdir(self.directory)):
+                if os.path.isfile(os.path.join(self.directory, name)):
+                    self._compile(name)
+
+    def get(self, name: str) -> Template:
+        entry = self._templates.get(name)
+        if entry is not None and not self.reload:
+            return entry[1]
+
+        with self._lock:
+            entry = self._templates.get(name)
+            if entry is None or (
+                os.stat(os.path.join(self.directory, name)).st_mtime != entry[0]
+            ):
+                return self._compile(name)
+            return entry[1]
+
+    def render(self, name: str, variables: dict) -> str:
+        return self.get(name).substitute(**variables)
+
+    def render_many(self, name: str, variables_list: list) -> list:
+        """
+        Render one template for each variables dict, e.g. for bulk sends.
+        """
+        template = self.get(name)
+        return [template.substitute(**variables) for variables in variables_list]
+
+
+email_templates = TemplateRegistry(EMAIL_TEMPLATES_DIR, reload=DEBUG)
+
+
+# input variables to html file
+def render_html_content(template_name, variables):
+    # Substitute the variables in the compiled template
+    return email_templates.render(template_name, variables)
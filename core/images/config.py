@@ -0,0 +1,111 @@
+import asyncio
+import multiprocessing
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps
+
+from common.constants import IMAGE_WORKERS
+
+
+# Longest side of each derivative, in pixels
+IMAGE_VARIANTS = {"thumbnail": 128, "medium": 512}
+
+# Derivative formats: (extension, Pillow format, save options)
+IMAGE_FORMATS = (
+    ("webp", "WEBP", {"quality": 80, "method": 4}),
+    ("jpg", "JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+)
+
+# Originals are stored as <sha256>.<extension>
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64})\.[a-z]+$")
+
+
+def image_variant_paths(path: str) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Return the derivative paths of a content-addressed original, by variant
+    and extension, e.g. {"thumbnail": {"webp": ..., "jpg": ...}}.
+
+    Originals stored before derivatives existed have none.
+    """
+    match = CONTENT_ADDRESSED_NAME.match(os.path.basename(path))
+    if match is None:
+        return None
+
+    directory = os.path.join(os.path.dirname(path), match.group(1))
+    return {
+        variant: {
+            extension: f"{directory}/{variant}.{extension}"
+            for extension, _, _ in IMAGE_FORMATS
+        }
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def generate_image_variants(path: str):
+    """
+    Write every resized and recompressed derivative of the image at `path`.
+
+    Runs in a worker process. Each file is written under a temporary name and
+    renamed, so a derivative is either complete or absent.
+    """
+    variant_paths = image_variant_paths(path)
+
+    with Image.open(path) as image:
+        # Apply the camera orientation, and flatten transparency for JPEG
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+        os.makedirs(
+            os.path.dirname(variant_paths["thumbnail"]["jpg"]), exist_ok=True
+        )
+
+        for variant, size in IMAGE_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+
+            for extension, image_format, options in IMAGE_FORMATS:
+                target = variant_paths[variant][extension]
+                temporary = f"{target}.{uuid.uuid4()}.tmp"
+                resized.save(temporary, image_format, **options)
+                os.replace(temporary, target)
+
+
+class ImageProcessor:
+    """
+    Run CPU-bound image work in a pool of worker processes.
+
+    The pool is started on first use. Workers are spawned rather than forked,
+    since the parent process already runs job and email threads.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def generate_variants(self, path: str):
+        await asyncio.wrap_future(
+            self._get_executor().submit(generate_image_variants, path)
+        )
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+image_processor = ImageProcessor(IMAGE_WORKERS)
@@ -0,0 +1,217 @@
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Optional
+import inspect
+import logging
+import signal
+import threading
+
+import orjson
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from common.constants import INSTRUMENTATION_ENABLED
+
+
+logger = logging.getLogger(__name__)
+
+# One JSON line per instrumented request
+access_logger = logging.getLogger("core.instrumentation.access")
+if not access_logger.handlers:
+    access_logger.addHandler(logging.StreamHandler())
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+
+# Sections reported for every instrumented request, in header order
+SECTIONS = ("db", "auth", "serialize", "password")
+
+
+class RequestTimings:
+    """
+    Time spent in each section during one request, with the number of calls.
+
+    Sections may overlap: a query run while authenticating counts towards both
+    "auth" and "db".
+    """
+
+    __slots__ = ("started", "sections")
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.sections = {}
+
+    def add(self, section: str, duration: float):
+        if (entry := self.sections.get(section)) is None:
+            self.sections[section] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+
+    def elapsed(self) -> float:
+        return perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        entries = []
+        for section in SECTIONS:
+            count, duration = self.sections.get(section, (0, 0.0))
+            entry = f"{section};dur={duration * 1000:.3f}"
+            if section == "db":
+                entry += f';desc="{count} queries"'
+            entries.append(entry)
+        entries.append(f"total;dur={self.elapsed() * 1000:.3f}")
+        return ", ".join(entries)
+
+    def log_fields(self) -> dict:
+        fields = {"duration_ms": round(self.elapsed() * 1000, 3)}
+        for section in SECTIONS:
+            count, duration = self.sections.get(section, (0, 0.0))
+            fields[f"{section}_ms"] = round(duration * 1000, 3)
+            fields[f"{section}_count"] = count
+        return fields
+
+
+# Timings of the current request, None when it is not instrumented. The object
+# is shared with the worker threads and greenlets the request runs code in.
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "current_timings", default=None
+)
+
+
+def timed(section: str) -> Callable:
+    """
+    Decorate a (sync or async) function so its calls count towards `section`.
+
+    Outside of an instrumented request the only cost is a context variable
+    lookup.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if (timings := current_timings.get()) is None:
+                    return await func(*args, **kwargs)
+                started = perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timings.add(section, perf_counter() - started)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if (timings := current_timings.get()) is None:
+                return func(*args, **kwargs)
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.add(section, perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_timings.get() is not None:
+        conn.info.setdefault("query_started", []).append(perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if (timings := current_timings.get()) is not None:
+        timings.add("db", perf_counter() - conn.info["query_started"].pop())
+
+
+def handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    if current_timings.get() is not None and (
+        started := exception_context.connection.info.get("query_started")
+    ):
+        started.pop()
+
+
+def instrument_engine(engine):
+    """
+    Count queries and their time per request, for a sync engine or the
+    sync_engine of an async one.
+    """
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+class Instrumentation:
+    """
+    Runtime switch for per-request instrumentation.
+
+    The switch is per process: SIGUSR1 toggles it in the worker receiving it,
+    so signal every uvicorn worker to toggle a whole deployment.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+
+    def toggle(self, *args):
+        self.enabled = not self.enabled
+        logger.warning(
+            "Request instrumentation %s", "enabled" if self.enabled else "disabled"
+        )
+
+    def install_signal_handler(self):
+        # Signal handlers can only be installed from the main thread, which
+        # is not where the lifespan runs under e.g. the test client
+        if not hasattr(signal, "SIGUSR1"):
+            return
+        if threading.current_thread() is not threading.main_thread():
+            logger.info("Not in the main thread, SIGUSR1 toggle not installed")
+            return
+        signal.signal(signal.SIGUSR1, self.toggle)
+
+
+instrumentation = Instrumentation(INSTRUMENTATION_ENABLED)
+
+
+class InstrumentationMiddleware:
+    """
+    Time each request and report its sections in a Server-Timing header and
+    in an access log line.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not instrumentation.enabled:
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        status_code = 500
+
+        async def send_with_timings(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", timings.server_timing()
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            current_timings.reset(token)
+            access_logger.info(
+                orjson.dumps(
+                    {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        **timings.log_fields(),
+                    }
+                ).decode()
+            )
@@ -0,0 +1,234 @@
+import os
+import re
+from typing import Optional, Tuple
+from urllib.parse import parse_qs
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+
+# A path component named after the SHA-256 of the stored content
+CONTENT_ADDRESSED_PART = re.compile(r"^([0-9a-f]{64})(\.[a-z]+)?$")
+
+# Content-addressed and versioned URLs never change, cache them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Any other URL is revalidated with its ETag on every use
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def content_hash(path: str) -> Optional[str]:
+    """
+    Return the SHA-256 a content-addressed media path is named after, if any.
+    """
+    for part in path.replace(os.sep, "/").split("/"):
+        match = CONTENT_ADDRESSED_PART.match(part)
+        if match is not None:
+            return match.group(1)
+    return None
+
+
+def media_url(base_url: str, path: str) -> str:
+    """
+    Build the immutable URL of a stored media file.
+
+    Content-addressed paths are immutable as is. Any other file is versioned
+    with a `v` query parameter derived from its modification time, so a new
+    version gets a new URL.
+    """
+    url = f"{base_url}/{path}"
+    if content_hash(path) is not None:
+        return url
+
+    try:
+        version = media_version(os.stat(path))
+    except OSError:
+        return url
+    return f"{url}?v={version}"
+
+
+def media_version(stat_result: os.stat_result) -> str:
+    """
+    The `v` query parameter of a mutable file's current version.
+    """
+    return format(stat_result.st_mtime_ns, "x")
+
+
+def parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end) offsets.
+
+    Returns None when the header should be ignored (other units, several
+    ranges or a malformed value) and raises ValueError when the range cannot
+    be satisfied.
+    """
+    unit, _, byte_range = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in byte_range:
+        return None
+
+    start, dash, end = byte_range.strip().partition("-")
+    if not dash or not (start.isdigit() or end.isdigit()):
+        return None
+    if (start and not start.isdigit()) or (end and not end.isdigit()):
+        return None
+
+    if not start:
+        # Suffix range: the last `end` bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - length, 0), size - 1
+
+    first = int(start)
+    if end and int(end) < first:
+        return None
+    if first >= size:
+        raise ValueError("Range not satisfiable")
+    return first, min(int(end), size - 1) if end else size - 1
+
+
+class MediaFileResponse(FileResponse):
+    """
+    A file response for a byte range of the file, sent without copying
+    through Python when the server supports it.
+
+    `http.response.zerocopysend` (sendfile) is used for any range and
+    `http.response.pathsend` for whole files; otherwise the file is read in
+    chunks with async file I/O.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        headers: dict,
+        byte_range: Optional[Tuple[int, int]] = None,
+    ):
+        super().__init__(path, headers=headers, stat_result=stat_result)
+        self.byte_range = byte_range
+
+        size = stat_result.st_size
+        if byte_range is not None:
+            start, end = byte_range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        start, end = self.byte_range or (0, self.stat_result.st_size - 1)
+        count = end - start + 1
+        extensions = scope.get("extensions", {})
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+
+        if scope["method"].upper() == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file,
+                        "offset": start,
+                        "count": count,
+                        "more_body": False,
+                    }
+                )
+        elif "http.response.pathsend" in extensions and self.byte_range is None:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                while count > 0:
+                    chunk = await file.read(min(self.chunk_size, count))
+                    count -= len(chunk)
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": count > 0 and bool(chunk),
+                        }
+                    )
+                    if not chunk:
+                        break
+
+
+class MediaFiles(StaticFiles):
+    """
+    Serve uploaded media with strong ETags, byte ranges and far-future
+    caching.
+
+    Content-addressed files and URLs versioned with the file's current `?v=`
+    are marked immutable, so browsers and CDNs reuse them without asking
+    again. Other files, and stale or made-up versions, must be revalidated,
+    which costs a 304 at most.
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        if status_code != 200:
+            # The html mode 404 page
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        path = self.get_path(scope)
+        digest = content_hash(path)
+        versioned = parse_qs(scope.get("query_string", b"").decode()).get("v") == [
+            media_version(stat_result)
+        ]
+
+        if digest is not None:
+            # The content is named after its hash; derivatives stored under
+            # it are told apart by their file name
+            name = os.path.basename(path)
+            etag = f'"{digest}"' if name.startswith(digest) else f'"{digest}-{name}"'
+        else:
+            etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+        headers = {
+            "etag": etag,
+            "accept-ranges": "bytes",
+            "cache-control": (
+                IMMUTABLE_CACHE_CONTROL
+                if digest is not None or versioned
+                else REVALIDATE_CACHE_CONTROL
+            ),
+        }
+
+        response = MediaFileResponse(full_path, stat_result, headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header is None or (
+            if_range is not None
+            and if_range not in (etag, response.headers["last-modified"])
+        ):
+            return response
+
+        try:
+            byte_range = parse_byte_range(range_header, stat_result.st_size)
+        except ValueError:
+            return Response(
+                status_code=416,
+                headers={"content-range": f"bytes */{stat_result.st_size}"},
+            )
+
+        if byte_range is None:
+            return response
+        return MediaFileResponse(full_path, stat_result, headers, byte_range)
@@ -0,0 +1,203 @@
+from time import perf_counter
+import os
+
+from common.constants import PROMETHEUS_MULTIPROC_DIR
+
+# prometheus_client reads PROMETHEUS_MULTIPROC_DIR on import, after .env is loaded
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+# Several uvicorn workers: every process writes its samples to memory mapped
+# files in PROMETHEUS_MULTIPROC_DIR and a scrape aggregates all of them. The
+# directory must be emptied before the server starts.
+MULTIPROCESS = bool(PROMETHEUS_MULTIPROC_DIR)
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve an HTTP request, by route template",
+    ["method", "route", "status"],
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Database connections currently checked out of the pool",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond pool_size (negative while the pool fills up)",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time to get a connection from the pool, connecting included",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag of each read replica, as last checked",
+    ["replica"],
+    multiprocess_mode="livemax",
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups",
+    "In-process cache lookups, by cache and result (hit, miss)",
+    ["cache", "result"],
+)
+
+EMAIL_MESSAGES = Counter(
+    "email_messages",
+    "Emails handed to the SMTP server, by outcome (sent, refused, failed)",
+    ["outcome"],
+)
+EMAIL_SEND_DURATION = Histogram(
+    "email_send_seconds",
+    "Time to send one email over a pooled SMTP session",
+)
+
+
+class MetricsMiddleware:
+    """
+    Count in-flight requests and observe their duration per route template.
+
+    Requests not matched by an API route (docs, media, 404s) are reported
+    under the "other" route so the label set stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            # The router stores the matched route in the shared scope
+            route = getattr(scope.get("route"), "path", "other")
+            REQUEST_DURATION.labels(method, route, status_code).observe(
+                perf_counter() - started
+            )
+
+
+class TimedPoolMixin:
+    """
+    Observe the time taken to get each connection from the pool.
+
+    The engine label is set on each pool by instrument_pool, so the primary
+    and every replica are told apart.
+    """
+
+    engine_label = "unknown"
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self.engine_label).observe(perf_counter() - started)
+
+    def recreate(self):
+        # Pools are recreated on dispose, the label must follow
+        pool = super().recreate()
+        pool.engine_label = self.engine_label
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(engine, engine_label: str):
+    """
+    Keep the pool gauges of a (sync) engine current on every checkout/checkin,
+    and label its pool wait times.
+    """
+    if isinstance(engine.pool, TimedPoolMixin):
+        engine.pool.engine_label = engine_label
+
+    checked_out = DB_POOL_CHECKED_OUT.labels(engine_label)
+    overflow = DB_POOL_OVERFLOW.labels(engine_label)
+
+    def on_checkout(*args):
+        checked_out.set(engine.pool.checkedout())
+        overflow.set(engine.pool.overflow())
+
+    def on_checkin(*args):
+        # Fired just before the connection goes back to the pool
+        checked_out.set(engine.pool.checkedout() - 1)
+        overflow.set(engine.pool.overflow())
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+
+
+class DefaultRegistryCollector:
+    # Exposes the process registry next to per-scrape collectors
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def render_metrics(*collectors) -> bytes:
+    """
+    Render every metric in the Prometheus text format.
+
+    `collectors` are evaluated during this scrape only, e.g. values read from
+    the database that are the same whichever process answers.
+    """
+    registry = CollectorRegistry()
+    if MULTIPROCESS:
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(DefaultRegistryCollector())
+    for collector in collectors:
+        registry.register(collector)
+    return generate_latest(registry)
+
+
+def mark_process_dead():
+    # Drop this process's live gauges (in-flight requests, pool) on shutdown
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
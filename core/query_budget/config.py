@@ -0,0 +1,148 @@
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from common.constants import QUERY_BUDGET_MODE
+
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_MODES = ("off", "log", "raise")
+
+if QUERY_BUDGET_MODE not in QUERY_BUDGET_MODES:
+    raise ValueError(f"QUERY_BUDGET_MODE must be one of {QUERY_BUDGET_MODES}")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryLog:
+    """
+    Statements executed during one request and the watched lazy loads.
+    """
+
+    __slots__ = ("statements", "lazy_loads")
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self.lazy_loads: List[str] = []
+
+
+# Query log of the current request, None outside of a checked request
+current_queries: ContextVar[Optional[QueryLog]] = ContextVar(
+    "current_queries", default=None
+)
+
+# Relationships that must never be lazy loaded while serving a request
+watched_relationships = set()
+
+
+def query_budget(max_queries: int) -> Callable:
+    """
+    Declare the most SQL statements a route may execute per request.
+
+    Apply it below the router decorator; the endpoint itself is unchanged.
+    The budget is only checked when QUERY_BUDGET_MODE is "log" or "raise".
+    """
+
+    def decorator(func: Callable) -> Callable:
+        func.query_budget = max_queries
+        return func
+
+    return decorator
+
+
+def watch_lazy_loads(*attributes):
+    """
+    Report lazy loads of these relationships (e.g. User.children) as violations.
+    """
+    watched_relationships.update(attribute.property for attribute in attributes)
+
+
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    if (queries := current_queries.get()) is not None:
+        queries.statements.append(statement)
+
+
+def record_lazy_load(orm_execute_state):
+    if (queries := current_queries.get()) is None:
+        return
+    if (
+        orm_execute_state.is_relationship_load
+        and orm_execute_state.lazy_loaded_from is not None
+    ):
+        prop = orm_execute_state.loader_strategy_path.prop
+        if prop in watched_relationships:
+            queries.lazy_loads.append(str(prop))
+
+
+def record_queries(engine):
+    """
+    Record the statements a (sync) engine executes for checked requests.
+    """
+    event.listen(engine, "before_cursor_execute", record_statement)
+
+
+# Every sync and async session runs its ORM statements through a Session
+event.listen(Session, "do_orm_execute", record_lazy_load)
+
+
+def budget_violations(route, queries: QueryLog) -> List[str]:
+    violations = [f"lazy load of {name}" for name in queries.lazy_loads]
+    budget = getattr(getattr(route, "endpoint", None), "query_budget", None)
+    if budget is not None and len(queries.statements) > budget:
+        violations.append(
+            f"{len(queries.statements)} queries over a budget of {budget}"
+        )
+    return violations
+
+
+class QueryBudgetMiddleware:
+    """
+    Check every request against its route's query budget and watched lazy loads.
+
+    The check runs when the response starts, so in "raise" mode the request
+    fails with a 500 (and the exception reaches the test client). Queries run
+    while a response is streamed are checked once it ends and only logged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or QUERY_BUDGET_MODE == "off":
+            return await self.app(scope, receive, send)
+
+        queries = QueryLog()
+        token = current_queries.set(queries)
+        reported = None
+
+        def check(final: bool):
+            nonlocal reported
+            violations = budget_violations(scope.get("route"), queries)
+            recorded = (len(queries.statements), len(queries.lazy_loads))
+            if not violations or recorded == reported:
+                return
+            reported = recorded
+            message = (
+                f"{scope['method']} {scope['path']}: {'; '.join(violations)}\n"
+                + "\n".join(queries.statements)
+            )
+            if QUERY_BUDGET_MODE == "raise" and not final:
+                raise QueryBudgetExceeded(message)
+            logger.error("Query budget exceeded by %s", message)
+
+        async def send_checked(message):
+            if message["type"] == "http.response.start":
+                check(final=False)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_checked)
+            check(final=True)
+        finally:
+            current_queries.reset(token)
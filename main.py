@@ -1,15 +1,54 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from authentication.routes import router as auth_router
 from apps.parent.routes import router as parent_router
 from apps.child.routes import router as child_router
+from apps.admin.routes import router as admin_router
+from apps.admin.utils import schedule_analytics_refresh
 from fastapi.openapi.utils import get_openapi
-from fastapi.staticfiles import StaticFiles
-
-
-app = FastAPI()
+from contextlib import asynccontextmanager
+from core.database.config import ReadYourWritesMiddleware, replicas
+from core.email.config import delivery_engine, email_templates
+from core.images.config import image_processor
+from core.instrumentation.config import InstrumentationMiddleware, instrumentation
+from core.media.config import MediaFiles
+from core.query_budget.config import QueryBudgetMiddleware, watch_lazy_loads
+from core.metrics.config import (
+    METRICS_CONTENT_TYPE,
+    MetricsMiddleware,
+    mark_process_dead,
+    render_metrics,
+)
+from common.models import Child, User
+from common.scheduler import job_queue_collector, job_workers
+from common.utils.passwords import password_hasher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile email templates once
+    email_templates.load()
+    # Poll the durable job queue
+    job_workers.start()
+    # Chain of scheduled refreshes of the admin analytics views
+    schedule_analytics_refresh()
+    # Watch read replica lag
+    replicas.start()
+    # SIGUSR1 toggles per-request instrumentation
+    instrumentation.install_signal_handler()
+    yield
+    job_workers.stop()
+    replicas.stop()
+    image_processor.shutdown()
+    password_hasher.shutdown()
+    # Flush queued emails and close pooled SMTP connections
+    delivery_engine.shutdown()
+    mark_process_dead()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 prefix = "/api"
@@ -45,9 +84,10 @@ app.openapi = custom_openapi
 app.include_router(auth_router, prefix=f"{prefix}")
 app.include_router(parent_router, prefix=f"{prefix}/parent")
 app.include_router(child_router, prefix=f"{prefix}/child")
+app.include_router(admin_router, prefix=f"{prefix}/admin")
 
-# Mount media folder
-app.mount("/media", StaticFiles(directory="media"), name="media")
+# Mount media folder (immutable URLs, strong ETags and byte ranges)
+app.mount("/media", MediaFiles(directory="media"), name="media")
 
 # Enable CORS
 app.add_middleware(
@@ -58,6 +98,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Keeps clients that just wrote reading from the primary across workers
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Server-Timing header and access log line
+app.add_middleware(InstrumentationMiddleware)
+
+# Prometheus request metrics
+app.add_middleware(MetricsMiddleware)
+
+# Development and tests: route query budgets and N+1 lazy loads
+app.add_middleware(QueryBudgetMiddleware)
+watch_lazy_loads(User.children, Child.parent)
+
+
+# Prometheus text format, aggregated over all worker processes
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(
+        render_metrics(job_queue_collector), media_type=METRICS_CONTENT_TYPE
+    )
+
 
 # Global exception handler
 @app.exception_handler(Exception)
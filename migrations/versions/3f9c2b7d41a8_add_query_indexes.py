@@ -0,0 +1,57 @@
+"""add query indexes
+
+Revision ID: 3f9c2b7d41a8
+Revises: aeb4f0dbc354
+Create Date: 2026-10-17 09:12:04.118263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2b7d41a8'
+down_revision: Union[str, None] = 'aeb4f0dbc354'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+        # Children listing: parent filter, created_at range and keyset order
+        op.create_index('ix_children_parent_id_created_at_id', 'children',
+                        ['parent_id', 'created_at', 'id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        # Children listing filtered by age
+        op.create_index('ix_children_parent_id_age', 'children',
+                        ['parent_id', 'age'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        # Case-insensitive substring search on the child's name (ILIKE '%...%')
+        op.create_index('ix_children_name_trgm', 'children', ['name'], unique=False,
+                        postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'},
+                        postgresql_concurrently=True, if_not_exists=True)
+        # Admin lookup on every child insert, only the few superuser rows
+        op.create_index('ix_users_active_superusers', 'users', ['id'], unique=False,
+                        postgresql_where=sa.text(
+                            'is_superuser = true AND is_active = true AND is_deleted = false'
+                        ),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    # pg_trgm is left installed, other objects may depend on it
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_active_superusers', table_name='users',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_children_name_trgm', table_name='children',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_children_parent_id_age', table_name='children',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_children_parent_id_created_at_id', table_name='children',
+                      postgresql_concurrently=True, if_exists=True)
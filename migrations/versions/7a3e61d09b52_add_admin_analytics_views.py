@@ -0,0 +1,92 @@
+"""add admin analytics views
+
+Revision ID: 7a3e61d09b52
+Revises: e2b9d47c1f60
+Create Date: 2026-10-17 23:02:37.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3e61d09b52'
+down_revision: Union[str, None] = 'e2b9d47c1f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Summaries read by the admin analytics routes instead of children and
+    # users. Refreshed CONCURRENTLY by the refresh_analytics job, which needs
+    # a unique index on each view. Autogenerate does not reflect materialized
+    # views, so they are not mapped.
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW analytics_children_by_age AS
+        WITH brackets (bracket, position, min_age, max_age) AS (
+            VALUES ('0-2', 1, 0, 2), ('3-5', 2, 3, 5), ('6-12', 3, 6, 12),
+                   ('13-17', 4, 13, 17), ('18+', 5, 18, NULL)
+        )
+        SELECT brackets.bracket, brackets.position,
+               count(children.id) AS children, now() AS refreshed_at
+        FROM brackets
+        LEFT JOIN children
+            ON children.is_deleted IS NOT TRUE
+            AND children.age >= brackets.min_age
+            AND (brackets.max_age IS NULL OR children.age <= brackets.max_age)
+        GROUP BY brackets.bracket, brackets.position
+        UNION ALL
+        SELECT 'unknown', 6, count(*), now()
+        FROM children
+        WHERE is_deleted IS NOT TRUE AND (age IS NULL OR age < 0)
+        """
+    )
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW analytics_daily_signups AS
+        SELECT day, sum(children)::integer AS children,
+               sum(parents)::integer AS parents, now() AS refreshed_at
+        FROM (
+            SELECT created_at::date AS day, count(*) AS children, 0 AS parents
+            FROM children
+            WHERE created_at IS NOT NULL
+            GROUP BY 1
+            UNION ALL
+            SELECT created_at::date, 0, count(*)
+            FROM users
+            WHERE is_parent AND created_at IS NOT NULL
+            GROUP BY 1
+        ) AS signups
+        GROUP BY day
+        """
+    )
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW analytics_parent_status AS
+        SELECT status, count(*) AS parents, now() AS refreshed_at
+        FROM (
+            SELECT CASE
+                WHEN is_deleted THEN 'deleted'
+                WHEN is_active THEN 'active'
+                ELSE 'inactive'
+            END AS status
+            FROM users
+            WHERE is_parent
+        ) AS parents
+        GROUP BY status
+        """
+    )
+    op.create_index('ix_analytics_children_by_age_bracket',
+                    'analytics_children_by_age', ['bracket'], unique=True)
+    op.create_index('ix_analytics_daily_signups_day',
+                    'analytics_daily_signups', ['day'], unique=True)
+    op.create_index('ix_analytics_parent_status_status',
+                    'analytics_parent_status', ['status'], unique=True)
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS analytics_parent_status")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS analytics_daily_signups")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS analytics_children_by_age")
@@ -0,0 +1,33 @@
+"""drop children name trgm index
+
+Revision ID: b61f0c8a2d94
+Revises: 7a3e61d09b52
+Create Date: 2026-10-17 20:21:05.730418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b61f0c8a2d94'
+down_revision: Union[str, None] = '7a3e61d09b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The children listing's name filter now matches word prefixes through
+    # ix_children_search_vector, nothing runs ILIKE '%...%' on Postgres anymore
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_children_name_trgm', table_name='children',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_children_name_trgm', 'children', ['name'], unique=False,
+                        postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'},
+                        postgresql_concurrently=True, if_not_exists=True)
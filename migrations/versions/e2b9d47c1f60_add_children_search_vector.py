@@ -0,0 +1,46 @@
+"""add children search vector
+
+Revision ID: e2b9d47c1f60
+Revises: c4a7e9b21d53
+Create Date: 2026-10-17 21:14:52.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b9d47c1f60'
+down_revision: Union[str, None] = 'c4a7e9b21d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Maintained by Postgres on every insert and update: the name weighted A,
+    # additional_info B. Not mapped on Child, see include_object in env.py.
+    # Adding a stored generated column rewrites the table.
+    op.execute(
+        """
+        ALTER TABLE children ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(additional_info, '')), 'B')
+        ) STORED
+        """
+    )
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        # Ranked search and the children listing's name filter
+        op.create_index('ix_children_search_vector', 'children', ['search_vector'],
+                        unique=False, postgresql_using='gin',
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_children_search_vector', table_name='children',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('children', 'search_vector')
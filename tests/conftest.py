@@ -0,0 +1,123 @@
+"""
+Test configuration: the app runs with QUERY_BUDGET_MODE=raise, so a route
+executing more statements than its @query_budget (or lazy loading a watched
+relationship) fails its test.
+
+Set TEST_DATABASE_URL to a migrated Postgres database (alembic upgrade head)
+to also run the Postgres-only tests; without it a temporary SQLite database
+is used.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app reads its configuration on import and serves media from ./media
+WORK_DIR = tempfile.mkdtemp(prefix="parent-child-tests-")
+os.makedirs(os.path.join(WORK_DIR, "media"))
+os.chdir(WORK_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+POSTGRES = bool(TEST_DATABASE_URL)
+
+os.environ.update(
+    DATABASE_URL=TEST_DATABASE_URL or f"sqlite:///{os.path.join(WORK_DIR, 'test.db')}",
+    QUERY_BUDGET_MODE="raise",
+    ANALYTICS_REFRESH_INTERVAL="0",
+    # Enqueued jobs (admin emails) are not executed
+    JOB_WORKERS="0",
+    # Fast hashes; the login rehash test stores slower ones
+    PASSWORD_HASH_ROUNDS="1000",
+)
+if not POSTGRES:
+    # The digest enqueues with a Postgres upsert
+    os.environ["CHILD_ADDED_DIGEST_ENABLED"] = "False"
+for name, value in {
+    "SECRET_KEY": "test-secret-key",
+    "DB_USERNAME": "postgres",
+    "DB_PASSWORD": "postgres",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "postgres",
+}.items():
+    os.environ.setdefault(name, value)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from common.models import User  # noqa: E402
+from common.utils.auth import (  # noqa: E402
+    create_access_token,
+    get_password_hash,
+    principal_cache,
+    token_cache,
+)
+from core.database.config import Base, SessionLocal, engine  # noqa: E402
+
+if not POSTGRES:
+    Base.metadata.create_all(engine)
+
+postgres_only = pytest.mark.skipif(
+    not POSTGRES, reason="needs a Postgres TEST_DATABASE_URL"
+)
+
+PASSWORD = "StrongPassword@1234"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def work_dir():
+    yield WORK_DIR
+    os.chdir(ROOT_DIR)
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def cold_auth_caches():
+    # Budgets must hold when the principal is not cached yet
+    principal_cache.clear()
+    token_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def create_user(password_hash: str = None, **values) -> User:
+    with SessionLocal() as db:
+        user = User(
+            **{
+                "first_name": "Ann",
+                "last_name": "Lee",
+                "email": f"{uuid.uuid4().hex}@example.com",
+                "password": password_hash or get_password_hash(PASSWORD),
+                "is_active": True,
+                "is_parent": True,
+                "is_superuser": False,
+                "is_deleted": False,
+                **values,
+            }
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        return user
+
+
+@pytest.fixture
+def parent() -> User:
+    return create_user()
+
+
+@pytest.fixture
+def auth_headers(parent):
+    return {"Authorization": f"Bearer {create_access_token({'sub': parent.id})}"}
@@ -0,0 +1,112 @@
+"""
+Every budgeted route must stay within its @query_budget, which the
+QUERY_BUDGET_MODE=raise configuration of conftest enforces: a route over
+budget raises QueryBudgetExceeded through the test client.
+"""
+
+from passlib.hash import pbkdf2_sha256
+
+from common.utils.auth import create_activation_token
+from conftest import PASSWORD, create_user, postgres_only
+
+CHILD = {"name": "John Doe", "age": 3, "additional_info": "Likes trains"}
+
+
+def add_child(client, headers, **values) -> dict:
+    response = client.post("/api/child/", headers=headers, json={**CHILD, **values})
+    assert response.status_code == 201, response.text
+    return response.json()["data"]
+
+
+def test_login(client, parent):
+    response = client.post(
+        "/api/login/", json={"email": parent.email, "password": PASSWORD}
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_login_rehashes_outdated_password(client):
+    user = create_user(pbkdf2_sha256.using(rounds=2000).hash(PASSWORD))
+
+    response = client.post(
+        "/api/login/", json={"email": user.email, "password": PASSWORD}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["email"] == user.email
+
+
+def test_activate(client):
+    user = create_user(is_active=False)
+
+    response = client.post(
+        "/api/activate/", json={"token": create_activation_token({"sub": user.id})}
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_list_children(client, auth_headers):
+    add_child(client, auth_headers)
+    add_child(client, auth_headers, name="Jane Doe")
+
+    response = client.get("/api/child/", headers=auth_headers, params={"limit": 1})
+    assert response.status_code == 200, response.text
+    assert len(response.json()["data"]) == 1
+
+    response = client.get(
+        "/api/child/", headers=auth_headers, params={"name": "jane", "age": 3}
+    )
+    assert response.status_code == 200, response.text
+    assert [child["name"] for child in response.json()["data"]] == ["Jane Doe"]
+
+
+def test_add_child(client, auth_headers):
+    assert add_child(client, auth_headers)["name"] == CHILD["name"]
+
+
+def test_update_child(client, auth_headers):
+    child = add_child(client, auth_headers)
+
+    response = client.patch(
+        "/api/child/",
+        headers=auth_headers,
+        params={"child_id": child["id"]},
+        json={"name": "Johnny Doe"},
+    )
+    assert response.status_code == 200, response.text
+
+
+@postgres_only
+def test_search_children(client, auth_headers):
+    add_child(client, auth_headers, name="Annabel Lee")
+
+    response = client.get(
+        "/api/child/search", headers=auth_headers, params={"q": "anna"}
+    )
+    assert response.status_code == 200, response.text
+    assert [child["name"] for child in response.json()["data"]] == ["Annabel Lee"]
+
+
+@postgres_only
+def test_add_children(client, auth_headers):
+    response = client.post(
+        "/api/child/bulk",
+        headers=auth_headers,
+        json={"children": [CHILD, {**CHILD, "name": "Jane Doe"}, {"name": ""}]},
+    )
+    assert response.status_code == 207, response.text
+
+
+@postgres_only
+def test_update_children(client, auth_headers):
+    children = [add_child(client, auth_headers), add_child(client, auth_headers)]
+
+    response = client.patch(
+        "/api/child/bulk",
+        headers=auth_headers,
+        json={
+            "children": [{"child_id": child["id"], "age": 4} for child in children]
+            + [{"child_id": 0, "age": 4}]
+        },
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["not_found"] == [0]